@@ -1,32 +1,74 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, Form
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, UploadFile, File, HTTPException, Form, Header, Depends, Request
+from fastapi.responses import Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 import os
+import re
 import json
-from pptx import Presentation
+import asyncio
 from pptx.util import Inches, Pt
 from pptx.dml.color import RGBColor
 from pptx.enum.text import PP_ALIGN, MSO_VERTICAL_ANCHOR
 from pptx.enum.shapes import MSO_SHAPE
-from pptx.oxml.ns import qn, nsdecls
-from pptx.oxml import parse_xml
+from pptx.oxml.ns import qn
 import io
-import tempfile
+import zipfile
 from pydantic import BaseModel
-from typing import List
-import pandas as pd
-import tempfile
-from openpyxl import Workbook
-from openpyxl.styles import Font
-from openpyxl.utils import get_column_letter
-from openpyxl.worksheet.datavalidation import DataValidation
-from datetime import datetime
-from pptx.enum.shapes import PP_PLACEHOLDER
-from copy import deepcopy
+from typing import Dict, List, Optional
+from functools import lru_cache
+from collections import deque
+import hashlib
+from template_cache import template_cache
+from borders import ALL_SIDES, HEADER_SIDES, apply_table_borders
+from text_metrics import TEXT_FONT_METRICS, count_lines, max_lines_per_row
+from table_builder import add_table_fast, cell_text, grid_widths
+from pagination import plan_pages
+from slide_clone import clone_slides
+from incremental import PreviousDeck, layout_key, page_hashes, reused_pages, write_manifest
+from status_classifier import status_classifier
+from validation import compile_limits, validate_batch, validate_request
+from wire_format import MSGPACK_TYPES, parse_deck_request
+from render_pool import RenderPool
+from output_cache import is_key, output_cache, previous_key, render_digest, request_key, upload_key
+from zip_stream import ZipStream
+from deck_writer import DECK_COMPRESSLEVEL, deck_bytes, deck_slide_count, iter_deck
+from phases import phase
+from tracing import TRACING_ENABLED, TracingMiddleware
+from profiling import profile_path, requested_profile, run_profiled, sampled_profile
+from metrics import (METRICS_ENABLED, MetricsMiddleware, collect, deck_rows, deck_slides, exposition,
+                     init_metrics_channel, muted, open_metrics_channel)
+from jobs import DONE, FAILED, init_progress_channel, job_progress, job_queue, open_progress_channel
 
 
 app = FastAPI()
 
+
+def init_render_worker(progress_channel=None, metrics_channel=None):
+    """Process-pool initializer: parse the templates once per worker process."""
+    template_cache.load_all()
+    if progress_channel is not None:
+        init_progress_channel(progress_channel)
+    if metrics_channel is not None:
+        init_metrics_channel(metrics_channel)
+
+
+render_pool = RenderPool(initializer=init_render_worker)
+
+
+@app.on_event("startup")
+def preload_templates():
+    # process workers load their own copies in init_render_worker
+    if render_pool.backend == "thread":
+        template_cache.load_all()
+    else:
+        metrics_channel = open_metrics_channel(render_pool.mp_context) if METRICS_ENABLED else None
+        render_pool.initargs = (open_progress_channel(render_pool.mp_context), metrics_channel)
+    render_pool.warm_up(warm_up_worker)
+
+
+@app.on_event("shutdown")
+def stop_render_pool():
+    render_pool.shutdown()
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -35,6 +77,10 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+if TRACING_ENABLED:
+    app.add_middleware(TracingMiddleware)
 
 class PPTXRequest(BaseModel):
     type: str
@@ -42,6 +88,21 @@ class PPTXRequest(BaseModel):
     columns: List[str]
     content: List[List[str]]
 
+
+class ColumnarPPTXRequest(BaseModel):
+    """PPTXRequest sent column by column: `data` maps each column name to its cells."""
+    type: str
+    title: str
+    columns: List[str]
+    data: Dict[str, List[str]]
+
+
+# /generate-pptx reads its body itself (see parse_deck_request); this documents it
+deck_request_body = {"requestBody": {"required": True, "content": {
+    media_type: {"schema": {"anyOf": [PPTXRequest.model_json_schema(), ColumnarPPTXRequest.model_json_schema()]}}
+    for media_type in ["application/json", *sorted(MSGPACK_TYPES)]
+}}}
+
 # Constants
 max_chars = {
     "Sl no.": 4,
@@ -51,41 +112,48 @@ max_chars = {
     "Remarks": 60,
     "Gone Live/ETA": 10
 }
-
-status_map = {
-    "action_over": "green",
-    "action_in_progress": "blue",
-    "progress_not_as_per_plan": "red",
-    "action_yet_to_start": "yellow"
-}
-
-status_colors = {
-    "green": RGBColor(0, 176, 80),    # #00B050
-    "blue": RGBColor(0, 112, 192),    # #0070C0
-    "red": RGBColor(192, 0, 0),       # #C00000
-    "yellow": RGBColor(255, 192, 0)   # #FFC000
-}
+# max_chars looked up case-insensitively ("What is the impact" in the template header)
+column_limits = compile_limits(max_chars)
 
 col_widths = [Inches(0.6), Inches(3.2), Inches(2.8), Inches(1.0), Inches(2.0), Inches(1.5), Inches(1.6)]
-rows_per_slide = 5
-
-
-def generate_pptx(data: PPTXRequest):
+# Tables end above the template footer, whose highest shapes are the logo at
+# the bottom right (from 6.97") and the slide number (from 7.00")
+table_bottom = Inches(6.95)
+# Rows per slide are planned from the estimated row heights; 0 = no extra cap
+max_rows_per_slide = int(os.getenv("PPTX_MAX_ROWS_PER_SLIDE", "0"))
+# Repeat the header row on continuation slides
+repeat_header = os.getenv("PPTX_REPEAT_HEADER", "1") != "0"
+template_name = "template_main_no_table_project_update_footer_new.pptx"
+# "fast" emits each table's XML in one pass, "proxy" goes through python-pptx cell objects
+table_renderer = os.getenv("PPTX_TABLE_RENDERER", "fast")
+# Most decks one batch request may ask for
+batch_max_decks = int(os.getenv("PPTX_BATCH_MAX_DECKS", "50"))
+# Seconds a batch waits before retrying when other requests fill the render pool
+batch_retry_delay = float(os.getenv("PPTX_BATCH_RETRY_DELAY", "0.5"))
+
+
+def deck_digest():
+    """`render_digest` of the current template and every setting that changes the rendered deck."""
+    return render_digest(template_cache.digest(template_name), repeat_header, max_rows_per_slide,
+                         TEXT_FONT_METRICS, status_classifier.digest, DECK_COMPRESSLEVEL)
+
+
+def generate_pptx(data: PPTXRequest, renderer=None, progress=None, previous=None):
+    """Build the deck for `data`; `progress(slides_done, slides_total)` is called as slides are filled.
+
+    Slides whose rows are unchanged from the `PreviousDeck` `previous` are
+    copied from it as they are instead of being rebuilt.
+    """
     columns = data.columns
     content = data.content
     title_text = data.title
+    renderer = renderer or table_renderer
 
-    # Validate
-    for row in content:
-        for i, cell in enumerate(row):
-            col_name = columns[i]
-            if col_name in max_chars:
-                cell_str = str(cell)
-                if len(cell_str) > max_chars[col_name]:
-                    raise HTTPException(status_code=400, detail=f"Cell in column '{col_name}' exceeds max length of {max_chars[col_name]} characters.")
+    # Requests are checked with validate_request before they are queued for rendering
 
     # Load template
-    prs = Presentation('powerpoints/template_main_no_table_project_update_footer_new.pptx')
+    with phase("template"):
+        prs = template_cache.get(template_name)
 
     # update_title_in_presentation(prs, title_text)
 
@@ -95,16 +163,36 @@ def generate_pptx(data: PPTXRequest):
     width = Inches(12.7)
     num_cols = len(columns)
 
-    min_row_height = Inches(0.3)
-
     # Status column index
     status_idx = columns.index("Status")
 
     # Alignments
     aligns = [PP_ALIGN.CENTER if i == 0 or i == status_idx else PP_ALIGN.LEFT for i in range(num_cols)]
 
-    # Split content into chunks
-    chunks = [content[i:i + rows_per_slide] for i in range(0, len(content), rows_per_slide)]
+    # Column widths and per-row heights, laid out for the whole deck before
+    # any table XML is built
+    widths = grid_widths(num_cols, width, col_widths)
+    header_height = Inches(0.4)
+    with phase("row_heights", rows=len(content)):
+        deck_row_heights = estimate_row_heights(content, widths, status_idx)
+
+    # Split content into pages that fit between the table top and the footer
+    with phase("paginate"):
+        pages = plan_pages(deck_row_heights, table_bottom - top, header_height, max_rows_per_slide, repeat_header)
+    chunks = [content[start:end] for start, end in pages]
+
+    # Hash each page and find the ones the previous deck already has (both
+    # renderers emit the same XML, so the renderer is not part of the layout)
+    layout = layout_key(template_cache.digest(template_name), title_text, columns, TEXT_FONT_METRICS,
+                        status_classifier.digest)
+    hashes = page_hashes(layout, chunks, [slide_idx == 0 or repeat_header for slide_idx in range(len(chunks))])
+    # {slide index: XML} of the slides taken as they are from the previous deck
+    reused = {}
+    if previous is not None:
+        for slide_idx, prev_idx in reused_pages(previous.manifest, layout, hashes).items():
+            xml = previous.slide_xml(prev_idx)
+            if xml is not None:
+                reused[slide_idx] = xml
 
     # Prepare slides
     # slides = [prs.slides[0]]
@@ -117,25 +205,86 @@ def generate_pptx(data: PPTXRequest):
     #     new_slide = prs.slides.add_slide(prs.slides[0].slide_layout)
     #     update_title_on_slide(new_slide, title_text)
     #     slides.append(new_slide)
-    for _ in range(len(chunks) - 1):
-        new_slide = duplicate_slide(prs, prs.slides[0])
-        slides.append(new_slide)
-        
+    with phase("slides", slides=len(chunks), reused=len(reused)):
+        stored = {slide_idx - 1: xml for slide_idx, xml in reused.items()}
+        slides.extend(clone_slides(prs, slides[0], len(chunks) - 1, stored))
+
     # Process each chunk
     for slide_idx, chunk in enumerate(chunks):
+        if progress is not None:
+            progress(slide_idx, len(chunks))
+        if slide_idx in reused:
+            continue
         slide = slides[slide_idx]
-        num_rows = len(chunk) + 1
-        height = num_rows * min_row_height
+        start, end = pages[slide_idx]
+        header = slide_idx == 0 or repeat_header
+
+        with phase("table", slide=slide_idx, rows=len(chunk)):
+            if renderer == "fast":
+                table = add_table_fast(slide, columns, chunk, left, top, widths, header_height,
+                                       deck_row_heights[start:end], status_idx, aligns, header=header)
+            else:
+                table = add_table_proxy(slide, columns, chunk, left, top, width, status_idx, aligns, header=header)
+
+        with phase("circles", slide=slide_idx):
+            add_status_circles(slide, table, chunk, left, top, status_idx, header)
+
+    with phase("manifest"):
+        write_manifest(prs, layout, hashes)
+    deck_rows.observe(len(content))
+    deck_slides.observe(len(chunks))
+    status_classifier.count(row[status_idx] for row in content)
+    if progress is not None:
+        progress(len(chunks), len(chunks))
+    return prs
+
+
+def add_status_circles(slide, table, chunk, left, top, status_idx, header):
+    """Draw each row's status circle, centred in the Status cell."""
+    num_rows = len(table.rows)
+    circle_diam = Inches(0.25)
+    first_data_row = 1 if header else 0
+    cumulative_y = [top + (table.rows[0].height if header else 0)]
+    for r in range(first_data_row, num_rows):
+        cumulative_y.append(cumulative_y[-1] + table.rows[r].height)
+
+    for data_idx, row_data in enumerate(chunk):
+        table_row_idx = data_idx + first_data_row
 
-        table_shape = slide.shapes.add_table(num_rows, num_cols, left, top, width, height)
-        table = table_shape.table
+        status_rgb = status_classifier.rgb(row_data[status_idx])
 
-        clear_table_style(table)
+        col_left = left + sum(table.columns[i].width for i in range(status_idx)) + (table.columns[status_idx].width - circle_diam) / 2
 
-        for i, w in enumerate(col_widths):
-            table.columns[i].width = w
+        row_top = cumulative_y[data_idx]
+        row_center = row_top + table.rows[table_row_idx].height / 2
+        circle_top = row_center - circle_diam / 2 + Inches(0.15)
 
-        # Header
+        circle = slide.shapes.add_shape(MSO_SHAPE.OVAL, col_left, circle_top, circle_diam, circle_diam)
+        circle.fill.solid()
+        circle.fill.fore_color.rgb = status_rgb
+        circle.line.width = Pt(0)
+
+
+def add_table_proxy(slide, columns, chunk, left, top, width, status_idx, aligns, header=True):
+    """Build one slide's table through the python-pptx cell proxies (reference renderer)."""
+    num_cols = len(columns)
+    min_row_height = Inches(0.3)
+    first_data_row = 1 if header else 0
+    num_rows = len(chunk) + first_data_row
+    height = num_rows * min_row_height
+
+    table_shape = slide.shapes.add_table(num_rows, num_cols, left, top, width, height)
+    table = table_shape.table
+    if not header:
+        table.first_row = False
+
+    clear_table_style(table)
+
+    for i, w in enumerate(col_widths):
+        table.columns[i].width = w
+
+    # Header
+    if header:
         for c, head in enumerate(columns):
             cell = table.cell(0, c)
             cell.text = head
@@ -148,88 +297,299 @@ def generate_pptx(data: PPTXRequest):
             run.font.bold = True
             run.font.color.rgb = RGBColor(255, 255, 255)
             cell.vertical_anchor = MSO_VERTICAL_ANCHOR.MIDDLE
-            set_header_border(cell)
 
         table.rows[0].height = Inches(0.4)
 
-        # Data rows
-        for r, row_data in enumerate(chunk, start=1):
-            for c, text in enumerate(row_data):
-                cell = table.cell(r, c)
-                if c == status_idx:
-                    cell.text = ""
-                else:
-                    cell.text = text
+    # Data rows
+    for r, row_data in enumerate(chunk, start=first_data_row):
+        for c, text in enumerate(row_data):
+            cell = table.cell(r, c)
+            if c == status_idx:
+                cell.text = ""
+            else:
+                cell.text = text
 
-                cell.fill.solid()
-                cell.fill.fore_color.rgb = RGBColor(255, 255, 255)
-                cell.text_frame.word_wrap = True
+            cell.fill.solid()
+            cell.fill.fore_color.rgb = RGBColor(255, 255, 255)
+            cell.text_frame.word_wrap = True
 
-                para = cell.text_frame.paragraphs[0]
-                para.alignment = aligns[c]
+            para = cell.text_frame.paragraphs[0]
+            para.alignment = aligns[c]
 
-                if cell.text:
-                    run = para.runs[0]
-                    run.font.size = Pt(12)
+            if cell.text:
+                run = para.runs[0]
+                run.font.size = Pt(12)
 
-                cell.vertical_anchor = MSO_VERTICAL_ANCHOR.MIDDLE
-                set_cell_border(cell)
+            cell.vertical_anchor = MSO_VERTICAL_ANCHOR.MIDDLE
+
+    # Borders: header left/right/bottom, data rows all sides
+    with phase("borders"):
+        apply_table_borders(table._tbl, header_sides=HEADER_SIDES if header else ALL_SIDES)
+
+    # Dynamic heights
+    min_height_pt = Inches(0.3).pt
+    for r in range(first_data_row, num_rows):
+        max_lines = 1
+        for c in range(num_cols):
+            if c == status_idx:
+                continue
+            cell = table.cell(r, c)
+            text = cell.text
+            col_width = table.columns[c].width
+            lines = estimate_lines(text, col_width)
+            max_lines = max(max_lines, lines)
+
+        line_height_pt = 15
+        required_height_pt = max_lines * line_height_pt + 20
+        table.rows[r].height = Pt(max(required_height_pt, min_height_pt))
+
+    return table
+
+
+def estimate_row_heights(rows, widths, status_idx):
+    """Row heights for `rows`, computed exactly like the proxy renderer's dynamic heights."""
+    min_height_pt = Inches(0.3).pt
+    line_height_pt = 15
+    texts = [[cell_text(text) for text in row_data] for row_data in rows]
+    return [
+        Pt(max(max_lines * line_height_pt + 20, min_height_pt))
+        for max_lines in max_lines_per_row(texts, widths, skip_columns=(status_idx,))
+    ]
 
-        # Dynamic heights
-        min_height_pt = Inches(0.3).pt
-        for r in range(1, num_rows):
-            max_lines = 1
-            for c in range(num_cols):
-                if c == status_idx:
-                    continue
-                cell = table.cell(r, c)
-                text = cell.text
-                col_width = table.columns[c].width
-                lines = estimate_lines(text, col_width)
-                max_lines = max(max_lines, lines)
 
-            line_height_pt = 15
-            required_height_pt = max_lines * line_height_pt + 20
-            table.rows[r].height = Pt(max(required_height_pt, min_height_pt))
+pptx_media_type = 'application/vnd.openxmlformats-officedocument.presentationml.presentation'
 
-        # Circles
-        circle_diam = Inches(0.25)
-        cumulative_y = [top + table.rows[0].height]
-        for r in range(1, num_rows):
-            cumulative_y.append(cumulative_y[-1] + table.rows[r].height)
 
-        for data_idx, row_data in enumerate(chunk):
-            table_row_idx = data_idx + 1
+def request_payload(data: PPTXRequest):
+    """Compact, picklable form of a request for shipping to a render worker."""
+    return (data.type, data.title, data.columns, data.content)
 
-            # status_key = row_data[status_idx].lower().replace(" ", "_")
-            # color_key = status_map.get(status_key, "yellow")
-            color_key = get_status_color(row_data[status_idx])
 
+def build_deck(payload, progress=None, previous=None):
+    """Build a deck from a request payload; runs on a render pool worker.
 
-            col_left = left + sum(table.columns[i].width for i in range(status_idx)) + (table.columns[status_idx].width - circle_diam) / 2
+    `previous` is an earlier deck (bytes) to copy unchanged slides from.
+    """
+    type_, title, columns, content = payload
+    previous = PreviousDeck(previous) if previous is not None else None
+    return generate_pptx(PPTXRequest(type=type_, title=title, columns=columns, content=content),
+                         progress=progress, previous=previous)
 
-            row_top = cumulative_y[data_idx]
-            row_center = row_top + table.rows[table_row_idx].height / 2
-            circle_top = row_center - circle_diam / 2 + Inches(0.15)
 
-            circle = slide.shapes.add_shape(MSO_SHAPE.OVAL, col_left, circle_top, circle_diam, circle_diam)
-            circle.fill.solid()
-            circle.fill.fore_color.rgb = status_colors[color_key]
-            circle.line.width = Pt(0)
+def render_deck(payload, progress=None, previous=None) -> bytes:
+    """`build_deck`, saved to .pptx bytes."""
+    return deck_bytes(build_deck(payload, progress, previous))
+
+
+def render_built_deck(build, *args) -> bytes:
+    return deck_bytes(build(*args))
+
+
+def stream_built_deck(emit, build, *args):
+    """Save the deck `build(*args)` returns, passing the file to `emit` chunk by chunk."""
+    prs = build(*args)
+    with phase("save") as attributes:
+        attributes["bytes"] = 0
+        for chunk in iter_deck(prs):
+            emit(chunk)
+            attributes["bytes"] += len(chunk)
+
+
+def stream_profiled_deck(emit, profile, build, *args):
+    """`stream_built_deck` under the profiler."""
+    run_profiled(profile, stream_built_deck, emit, build, *args)
+
+
+def warm_up_worker():
+    """Render a one-row deck so a fresh worker has its templates and code paths warm.
+
+    Its rows, slides, phases and status cells are left out of the metrics.
+    """
+    with muted():
+        render_deck(("project_update", "Warm up", ["Sl no.", "Status"], [["1", "Action Over"]]))
+
+
+def attachment_response(content: bytes, media_type: str, filename: str):
+    """Send an in-memory file as a download; nothing touches the disk."""
+    return Response(
+        content=content,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+def deck_response(deck: bytes):
+    return attachment_response(deck, pptx_media_type, "generated.pptx")
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    # weak comparison, as If-None-Match uses: W/ is ignored on both sides
+    if not if_none_match:
+        return False
+    etag = etag.removeprefix("W/")
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or any(t.removeprefix("W/") == etag for t in tags)
+
+
+async def streamed_deck_response(key: str, etag: str, build, *args, profile=None):
+    """Send the deck `build(*args)` returns while it is being saved, caching it once complete."""
+    if profile is None:
+        chunks = render_pool.stream(stream_built_deck, build, *args)
+    else:
+        chunks = render_pool.stream(stream_profiled_deck, profile, build, *args)
+    # Nothing is saved before the deck is built, so build errors still get a proper status
+    first = await anext(chunks)
+
+    async def body():
+        parts = [first]
+        yield first
+        async for chunk in chunks:
+            parts.append(chunk)
+            yield chunk
+        output_cache.put(key, b"".join(parts))
+
+    headers = {"Content-Disposition": 'attachment; filename="generated.pptx"', "ETag": etag}
+    if profile is not None:
+        headers["X-Profile-Path"] = profile_path(profile)
+    return StreamingResponse(body(), media_type=pptx_media_type, headers=headers)
+
+
+def request_profile(
+    x_profile: Optional[str] = Header(None),
+    x_profile_memory: Optional[str] = Header(None),
+    x_request_id: Optional[str] = Header(None),
+):
+    """Profile asked for with `X-Profile: <PPTX_PROFILE_TOKEN>`, or None.
+
+    `X-Profile-Memory: 1` also traces allocations; files are named after
+    X-Request-ID when it is sent.
+    """
+    return requested_profile(x_profile, x_profile_memory not in (None, "", "0"), x_request_id)
+
+
+async def cached_deck_response(key: str, if_none_match: Optional[str], build, *args, profile=None):
+    """Serve a deck from the output cache (or 304), building it with `build(*args)` on a miss.
+
+    A `profile`d request always renders, skipping the cache, so there is
+    something to profile; so do a PPTX_PROFILE_SAMPLE_RATE share of misses.
+    The stats location is sent in X-Profile-Path.
+    """
+    etag = f'"{key}"'
+    deck = None
+    if profile is None:
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+        deck = output_cache.get(key)
+        if deck is None:
+            profile = sampled_profile()
+
+    if deck is None and render_pool.backend == "thread":
+        return await streamed_deck_response(key, etag, build, *args, profile=profile)
+    if deck is None:
+        # worker processes hand back the finished file
+        if profile is None:
+            deck = await render_pool.run(render_built_deck, build, *args)
+        else:
+            deck = await render_pool.run(run_profiled, profile, render_built_deck, build, *args)
+        output_cache.put(key, deck)
+
+    response = deck_response(deck)
+    response.headers["ETag"] = etag
+    if profile is not None:
+        response.headers["X-Profile-Path"] = profile_path(profile)
+    return response
+
+
+async def read_upload(file: UploadFile) -> bytes:
+    with phase("upload_read", filename=file.filename) as attributes:
+        content = await file.read()
+        attributes["bytes"] = len(content)
+    return content
 
-    return prs
 
+def parse_excel_request(excel_content: bytes) -> PPTXRequest:
+    from excel_reader import read_workbook
 
-@app.post("/generate-pptx")
-def generate_pptx_endpoint(request: PPTXRequest):
-    prs = generate_pptx(request)
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.pptx') as tmp:
-        prs.save(tmp.name)
-        return FileResponse(tmp.name, media_type='application/vnd.openxmlformats-officedocument.presentationml.presentation', filename='generated.pptx')
+    # Title = merged A1:G1, headers = row 2 (A2:G2), data = rows 3 onwards
+    with phase("excel_parse", bytes=len(excel_content)) as attributes:
+        title, columns, content = read_workbook(excel_content)
+        attributes["rows"] = len(content)
+
+    # Spreadsheet row numbers in the error report
+    validate_request(columns, content, column_limits, first_row=3)
+
+    # Assuming type is fixed or not needed; set to a default
+    return PPTXRequest(type="project_update", title=title, columns=columns, content=content)
+
+
+def build_excel_deck(excel_content: bytes):
+    return build_deck(request_payload(parse_excel_request(excel_content)))
+
+
+async def read_deck_request(body: bytes, content_type: Optional[str]):
+    """Request payload from a PPTXRequest or columnar body (JSON or MessagePack), validated."""
+    with phase("parse_body", bytes=len(body)) as attributes:
+        payload = parse_deck_request(body, content_type)
+        attributes["rows"] = len(payload[3])
+    validate_request(payload[2], payload[3], column_limits)
+    return payload
+
+
+@app.post("/generate-pptx", openapi_extra=deck_request_body)
+async def generate_pptx_endpoint(
+    request: Request,
+    if_none_match: Optional[str] = Header(None),
+    profile=Depends(request_profile),
+):
+    """Deck for a PPTXRequest, or the same request in columnar form; JSON or MessagePack by Content-Type."""
+    payload = await read_deck_request(await request.body(), request.headers.get("content-type"))
+    key = request_key(payload, deck_digest())
+    return await cached_deck_response(key, if_none_match, build_deck, payload, profile=profile)
+
+
+@app.post("/generate-pptx/incremental")
+async def generate_pptx_incremental(
+    request: str = Form(...),
+    previous: Optional[UploadFile] = File(None),
+    previous_etag: Optional[str] = Form(None),
+    if_none_match: Optional[str] = Header(None),
+    profile=Depends(request_profile),
+):
+    """/generate-pptx for a changed version of an earlier deck, rebuilding only the slides that changed.
+
+    `request` is the PPTXRequest JSON, or its columnar form. The earlier deck
+    is either uploaded as `previous` or named by the ETag it was served with,
+    while it is still in the output cache. Without it (or for decks from
+    before layout manifests) every slide is rendered, as /generate-pptx would.
+
+    The previous deck comes from the client, so the result is cached (and
+    tagged) under a key that includes it: it never stands in for the deck
+    /generate-pptx would serve for the same request.
+    """
+    payload = await read_deck_request(request.encode(), "application/json")
+    key = request_key(payload, deck_digest())
+
+    if previous is not None:
+        previous_deck = await read_upload(previous)
+    elif previous_etag:
+        previous_etag = previous_etag.removeprefix("W/").strip('"')
+        if not is_key(previous_etag):
+            raise HTTPException(status_code=400, detail="previous_etag is not an ETag served by this API.")
+        previous_deck = output_cache.get(previous_etag)
+    else:
+        previous_deck = None
+    if previous_deck is not None:
+        key = previous_key(key, previous_deck)
+    return await cached_deck_response(key, if_none_match, build_deck, payload, None, previous_deck,
+                                      profile=profile)
 
 
 @app.post("/generate-pptx-from-excel")
-async def generate_pptx_from_excel(file: UploadFile = File(...)):
+async def generate_pptx_from_excel(
+    file: UploadFile = File(...),
+    if_none_match: Optional[str] = Header(None),
+    profile=Depends(request_profile),
+):
     if not file.filename.endswith('.xlsx'):
         raise HTTPException(status_code=400, detail="File must be an .xlsx file.")
     
@@ -237,50 +597,253 @@ async def generate_pptx_from_excel(file: UploadFile = File(...)):
     # df = pd.read_excel(io.BytesIO(excel_content))
     # columns = list(df.columns)
     # content = df.astype(str).values.tolist()
-    excel_content = await file.read()
-
-    # Read WITHOUT headers
-    df_raw = pd.read_excel(io.BytesIO(excel_content), header=None)
-
-    # Title = merged A1:G1
-    title = str(df_raw.iloc[0, 0]).strip()
-
-    # Headers = row 2 (A2:G2)
-    columns = df_raw.iloc[1].astype(str).tolist()
-
-    if "Status" not in columns:
-        raise HTTPException(
-            status_code=400,
-            detail=f"'Status' column not found. Found columns: {columns}"
-        )
-
-    # Data = rows 3 onwards
-    # content = (
-    #     df_raw.iloc[2:]
-    #     .dropna(how="all")      # remove fully empty rows
-    #     .astype(str)
-    #     .values
-    #     .tolist()
-    # )
-    content = (
-        df_raw.iloc[2:]
-        .dropna(how="all")
-        .applymap(normalize_cell)
-        .values
-        .tolist()
+    excel_content = await read_upload(file)
+
+    # Parsing and rendering are CPU bound; keep them off the event loop
+    key = upload_key(excel_content, deck_digest())
+    return await cached_deck_response(key, if_none_match, build_excel_deck, excel_content, profile=profile)
+
+
+def deck_filename(index: int, label: str) -> str:
+    """Zip member name for the `index`th deck of a batch, e.g. "02-Team-B.pptx"."""
+    slug = re.sub(r"[^A-Za-z0-9]+", "-", label).strip("-")[:60] or "deck"
+    return f"{index + 1:02d}-{slug}.pptx"
+
+
+def check_batch_size(count: int):
+    if not count:
+        raise HTTPException(status_code=400, detail="Batch has no decks.")
+    if count > batch_max_decks:
+        raise HTTPException(status_code=400, detail=f"Batch has {count} decks; at most {batch_max_decks} are allowed.")
+
+
+def parse_excel_batch(excel_content: bytes):
+    """[(sheet name, payload)] for every deck sheet of an uploaded workbook."""
+    from excel_reader import read_workbook_sheets
+
+    sheets = read_workbook_sheets(excel_content)
+    check_batch_size(len(sheets))
+    validate_batch([(f"Sheet '{name}'", columns, content, 3) for name, _, columns, content in sheets], column_limits)
+    return [
+        (name, request_payload(PPTXRequest(type="project_update", title=title, columns=columns, content=content)))
+        for name, title, columns, content in sheets
+    ]
+
+
+def submit_batch_renders(queue, pending):
+    """Move queued (name, key, payload) jobs onto the render pool, at most one per worker.
+
+    A job the pool turns away stays queued until one of ours finishes; with
+    none of ours running, the pool's 503 is raised.
+    """
+    while queue and len(pending) < render_pool.workers:
+        name, key, payload = queue[0]
+        try:
+            future = render_pool.submit(render_deck, payload)
+        except HTTPException:
+            if pending:
+                break
+            raise
+        queue.popleft()
+        pending[asyncio.wrap_future(future)] = (name, key)
+
+
+async def batch_zip_chunks(ready, queue, pending):
+    """Zip of the batch, yielding each deck as it finishes rendering."""
+    archive = ZipStream()
+    for name, deck in ready:
+        yield archive.add(name, deck)
+    while queue or pending:
+        try:
+            submit_batch_renders(queue, pending)
+        except HTTPException:
+            await asyncio.sleep(batch_retry_delay)
+            continue
+        done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            name, key = pending.pop(task)
+            deck = task.result()
+            output_cache.put(key, deck)
+            yield archive.add(name, deck)
+    yield archive.close()
+
+
+def batch_response(jobs):
+    """Stream (name, key, payload) jobs back as one zip.
+
+    Cached decks go out first, the rest are spread over the render workers
+    (sharing their parsed templates) and added in the order they finish.
+    The first renders are queued before the response starts, so a saturated
+    pool still gets a clean 503.
+    """
+    ready, queue, pending = [], deque(), {}
+    for name, key, payload in jobs:
+        deck = output_cache.get(key)
+        if deck is None:
+            queue.append((name, key, payload))
+        else:
+            ready.append((name, deck))
+    submit_batch_renders(queue, pending)
+    return StreamingResponse(
+        batch_zip_chunks(ready, queue, pending),
+        media_type="application/zip",
+        headers={"Content-Disposition": 'attachment; filename="generated.zip"'},
     )
 
-    # Assuming type is fixed or not needed; set to a default
-    data = PPTXRequest(type="project_update", title=title, columns=columns, content=content)
-    
-    prs = generate_pptx(data)
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.pptx') as tmp:
-        prs.save(tmp.name)
-        return FileResponse(tmp.name, media_type='application/vnd.openxmlformats-officedocument.presentationml.presentation', filename='generated.pptx')
 
+@app.post("/generate-pptx/batch")
+async def generate_pptx_batch(requests: List[PPTXRequest]):
+    check_batch_size(len(requests))
+    validate_batch([(f"Deck {i + 1}", r.columns, r.content, 1) for i, r in enumerate(requests)], column_limits)
+    digest = deck_digest()
+    jobs = []
+    for i, request in enumerate(requests):
+        payload = request_payload(request)
+        jobs.append((deck_filename(i, request.title), request_key(payload, digest), payload))
+    return batch_response(jobs)
+
+
+@app.post("/generate-pptx-from-excel/batch")
+async def generate_pptx_from_excel_batch(file: UploadFile = File(...)):
+    if not file.filename.endswith('.xlsx'):
+        raise HTTPException(status_code=400, detail="File must be an .xlsx file.")
+    excel_content = await read_upload(file)
+
+    # One deck per sheet: parse them all in one worker, then fan the renders out
+    sheets = await render_pool.run(parse_excel_batch, excel_content)
+    digest = deck_digest()
+    jobs = [
+        (deck_filename(i, name), request_key(payload, digest), payload)
+        for i, (name, payload) in enumerate(sheets)
+    ]
+    return batch_response(jobs)
+
+
+def render_job_deck(job_id: str, payload) -> bytes:
+    """`render_deck` for a job, recording its slide progress."""
+    return render_deck(payload, progress=job_progress(job_id))
+
+
+def render_job_excel(job_id: str, excel_content: bytes) -> bytes:
+    return render_job_deck(job_id, request_payload(parse_excel_request(excel_content)))
+
+
+def job_runner(key: str, render, *args):
+    """Job body: the deck cached under `key`, else `render(job_id, *args)` on the pool."""
+    async def run(job_id):
+        deck = output_cache.get(key)
+        if deck is None:
+            deck = await render_pool.run(render, job_id, *args)
+            output_cache.put(key, deck)
+        else:
+            slides = deck_slide_count(deck)
+            job_progress(job_id)(slides, slides)
+        return deck
+    return run
+
+
+def job_status(job):
+    status = {
+        "id": job["id"],
+        "status": job["status"],
+        "progress": {"slides_done": job["slides_done"], "slides_total": job["slides_total"]},
+        "created": job["created"],
+        "started": job["started"],
+        "finished": job["finished"],
+    }
+    if job["status"] == FAILED:
+        status["error"] = job["error"]
+    return status
+
+
+def find_job(job_id: str):
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found (it may have expired).")
+    return job
+
+
+@app.post("/jobs", status_code=202)
+async def create_job(request: PPTXRequest):
+    validate_request(request.columns, request.content, column_limits)
+    payload = request_payload(request)
+    key = request_key(payload, deck_digest())
+    return job_status(job_queue.submit(job_runner(key, render_job_deck, payload), key=key))
+
+
+@app.post("/jobs/from-excel", status_code=202)
+async def create_excel_job(file: UploadFile = File(...)):
+    if not file.filename.endswith('.xlsx'):
+        raise HTTPException(status_code=400, detail="File must be an .xlsx file.")
+    excel_content = await read_upload(file)
+
+    # Parse errors surface on the job, like render errors
+    key = upload_key(excel_content, deck_digest())
+    return job_status(job_queue.submit(job_runner(key, render_job_excel, excel_content), key=key))
+
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    return job_status(find_job(job_id))
+
+
+@app.get("/jobs/{job_id}/result")
+def get_job_result(job_id: str, if_none_match: Optional[str] = Header(None)):
+    job = find_job(job_id)
+    if job["status"] == FAILED:
+        raise HTTPException(status_code=job["error"]["status_code"], detail=job["error"]["detail"])
+    if job["status"] != DONE:
+        raise HTTPException(status_code=409, detail=f"Job is still {job['status']}.")
+
+    etag = f'"{job["key"]}"'
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    deck = job_queue.store.result(job_id)
+    if deck is None:
+        raise HTTPException(status_code=404, detail="Job not found (it may have expired).")
+    response = deck_response(deck)
+    response.headers["ETag"] = etag
+    return response
+
+
+# Read on each scrape
+collect("pptx_render_in_flight", "Renders running or waiting for a render worker.", "gauge",
+        lambda: {(): render_pool.in_flight})
+collect("pptx_render_workers", "Render pool size.", "gauge", lambda: {(): render_pool.workers})
+collect("pptx_jobs_unfinished", "Background jobs queued or running.", "gauge",
+        lambda: {(): job_queue.store.count_unfinished()})
+
+
+@app.get("/metrics")
+def get_metrics():
+    """Prometheus scrape endpoint; 404 unless PPTX_METRICS is on."""
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return Response(exposition(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+# Headers and Status dropdown of the downloadable Excel template
+template_headers = [
+    "Sl no.",
+    "Brief about change",
+    "What is the impact",           # Capitalized for consistency
+    "Dev effort",
+    "Remarks",
+    "Gone Live/ETA",
+    "Status"
+]
+template_status_options = "Action Over,In Progress,Not as per Plan,Yet to Start"
+
+
+@lru_cache(maxsize=8)
+def build_template_workbook(headers: tuple, status_options: str):
+    """Render the Excel template once per (headers, status options); returns (bytes, etag)."""
+    # openpyxl (and the numpy it pulls in) is only needed here and for uploads
+    from openpyxl import Workbook
+    from openpyxl.styles import Font
+    from openpyxl.utils import get_column_letter
+    from openpyxl.worksheet.datavalidation import DataValidation
 
-@app.get("/download-template")
-def download_template():
     wb = Workbook()
     ws = wb.active
     ws.title = "Project Update"
@@ -292,16 +855,6 @@ def download_template():
     title_cell.font = Font(bold=True, size=16)
 
     # === Headers (row 2) ===
-    headers = [
-        "Sl no.",
-        "Brief about change",
-        "What is the impact",           # Capitalized for consistency
-        "Dev effort",
-        "Remarks",
-        "Gone Live/ETA",
-        "Status"
-    ]
-
     for col_idx, header in enumerate(headers, start=1):
         cell = ws.cell(row=2, column=col_idx, value=header)
         cell.font = Font(bold=True)
@@ -311,7 +864,6 @@ def download_template():
         ws.cell(row=r, column=1, value=r - 2)
 
     # === Dropdown for Status (column G, starting row 3) ===
-    status_options = "Action Over,In Progress,Not as per Plan,Yet to Start"
     dv = DataValidation(
         type="list",
         formula1=f'"{status_options}"',
@@ -331,15 +883,37 @@ def download_template():
     # Freeze header rows so they stay visible when scrolling
     ws.freeze_panes = "A3"
 
-    # Save to temporary file
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx') as tmp:
-        wb.save(tmp.name)
+    out = io.BytesIO()
+    wb.save(out)
+
+    # Keyed on every part but docProps/core.xml (it holds the save time), so
+    # every worker hands out the same ETag, and it changes with anything that
+    # changes the workbook: the inputs, the code above, openpyxl. Weak, as the
+    # save time (and zip entry times) still make each build's bytes differ
+    h = hashlib.sha256()
+    with zipfile.ZipFile(out) as workbook:
+        for name in sorted(workbook.namelist()):
+            if name != "docProps/core.xml":
+                h.update(name.encode())
+                h.update(workbook.read(name))
+    etag = 'W/"' + h.hexdigest()[:32] + '"'
+    return out.getvalue(), etag
 
-    return FileResponse(
-        tmp.name,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        filename="project-update-template.xlsx"
+
+@app.get("/download-template")
+def download_template(if_none_match: Optional[str] = Header(None)):
+    workbook, etag = build_template_workbook(tuple(template_headers), template_status_options)
+    cache_headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=cache_headers)
+
+    response = attachment_response(
+        workbook,
+        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        "project-update-template.xlsx"
     )
+    response.headers.update(cache_headers)
+    return response
     
 # def update_title_in_presentation(prs, new_title):
 #     if not new_title.strip():
@@ -542,124 +1116,8 @@ def clear_table_style(table):
         tblPr.remove(style_id)
 
 
-def set_cell_border(cell, rgb=(0, 0, 0), width_emu="19050"):
-    """Apply full borders (all sides) to a cell."""
-    tc = cell._tc
-    tcPr = tc.get_or_add_tcPr()
-    r, g, b = rgb
-    hex_color = f"{r:02X}{g:02X}{b:02X}"
-    line_xml_template = (
-        f'<a:ln {nsdecls("a")} w="{width_emu}" cap="flat" cmpd="sng" algn="ctr">'
-        f' <a:solidFill><a:srgbClr val="{hex_color}"/></a:solidFill>'
-        f' <a:prstDash val="solid"/>'
-        f'</a:ln>'
-    )
-    for side in ("lnL", "lnR", "lnT", "lnB"):
-        existing_ln = tcPr.find(qn(f"a:{side}"))
-        if existing_ln is not None:
-            tcPr.remove(existing_ln)
-        border_element = parse_xml(line_xml_template.replace("a:ln", f"a:{side}"))
-        tcPr.append(border_element)
-
-
-def set_header_border(cell, rgb=(0, 0, 0), width_emu="19050"):
-    """Apply borders to header: left, right, bottom only (no top)."""
-    tc = cell._tc
-    tcPr = tc.get_or_add_tcPr()
-    r, g, b = rgb
-    hex_color = f"{r:02X}{g:02X}{b:02X}"
-    line_xml_template = (
-        f'<a:ln {nsdecls("a")} w="{width_emu}" cap="flat" cmpd="sng" algn="ctr">'
-        f' <a:solidFill><a:srgbClr val="{hex_color}"/></a:solidFill>'
-        f' <a:prstDash val="solid"/>'
-        f'</a:ln>'
-    )
-    for side in ("lnL", "lnR", "lnB"):
-        existing_ln = tcPr.find(qn(f"a:{side}"))
-        if existing_ln is not None:
-            tcPr.remove(existing_ln)
-        border_element = parse_xml(line_xml_template.replace("a:ln", f"a:{side}"))
-        tcPr.append(border_element)
-
-
-def estimate_lines(text, col_width_emu, font_size_pt=12, avg_char_width_pt=7):
+def estimate_lines(text, col_width_emu, font_size_pt=12):
     """Estimate number of lines needed for text wrapping."""
-    col_width_pt = col_width_emu / 12700.0
-    chars_per_line = max(1, int(col_width_pt / avg_char_width_pt))
-    if not text:
-        return 1
-    words = text.split()
-    lines = 0
-    current_len = 0
-    for word in words:
-        word_len = len(word)
-        space_needed = 1 if current_len > 0 else 0
-        if current_len + space_needed + word_len <= chars_per_line:
-            current_len += space_needed + word_len
-        else:
-            if current_len > 0:
-                lines += 1
-                current_len = 0
-                space_needed = 0
-            while word_len > 0:
-                chunk_len = min(word_len, chars_per_line - current_len - space_needed)
-                current_len += space_needed + chunk_len
-                word_len -= chunk_len
-                space_needed = 0
-                if current_len >= chars_per_line:
-                    lines += 1
-                    current_len = 0
-    if current_len > 0:
-        lines += 1
-    return max(1, lines)
-
-def get_status_color(status_str: str) -> str:
-    if not status_str:
-        return "yellow"
-    
-    s = str(status_str).strip().lower()
-    
-    mapping = {
-        # Exact dropdown values
-        "action over": "green",
-        "over": "green",
-        "completed": "green",
-        
-        "in progress": "blue",
-        "progress": "blue",
-        
-        "not as per plan": "red",
-        "delayed": "red",
-        
-        "yet to start": "yellow",
-        "pending": "yellow",
-        "to do": "yellow",
-        "todo": "yellow",
-    }
-    
-    for key, color in mapping.items():
-        if key in s:
-            return color
-    
-    return "yellow"  # default
-
-
-def normalize_cell(cell):
-    if isinstance(cell, (pd.Timestamp, datetime)):
-        return cell.strftime("%d/%m/%Y")  # exactly 10 chars
-    return str(cell).strip()
-
+    return count_lines(text, col_width_emu, font_size_pt)
 
-def duplicate_slide(prs, slide):
-    slide_layout = slide.slide_layout
-    new_slide = prs.slides.add_slide(slide_layout)
-
-    # Remove default shapes
-    for shape in list(new_slide.shapes):
-        new_slide.shapes._spTree.remove(shape._element)
-
-    # Clone shapes from source slide
-    for shape in slide.shapes:
-        new_slide.shapes._spTree.append(deepcopy(shape._element))
 
-    return new_slide
\ No newline at end of file
@@ -0,0 +1,90 @@
+"""Compare the streaming xlsx reader (excel_reader) against the old pandas ingestion path.
+
+Run from pptx-backend/:  python benchmarks/bench_excel_ingest.py [rows ...]
+(pandas is only needed for the comparison column).
+"""
+import io
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openpyxl import Workbook
+
+from excel_reader import read_workbook
+
+
+HEADERS = ["Sl no.", "Brief about change", "What is the impact", "Dev effort", "Remarks", "Gone Live/ETA", "Status"]
+STATUSES = ["Action Over", "In Progress", "Not as per Plan", "Yet to Start"]
+
+
+def make_workbook(rows):
+    wb = Workbook()
+    ws = wb.active
+    ws["A1"] = "Benchmark"
+    ws.merge_cells("A1:G1")
+    ws.append(HEADERS)
+    for i in range(rows):
+        ws.append([
+            i + 1,
+            "Brief about change " * (1 + i % 4),
+            "Impact " * (1 + i % 6),
+            "M",
+            "Remark " * (i % 5),
+            datetime(2026, 1 + i % 12, 1 + i % 28),
+            STATUSES[i % 4],
+        ])
+    out = io.BytesIO()
+    wb.save(out)
+    return out.getvalue()
+
+
+def read_with_pandas(excel_content):
+    """The ingestion path /generate-pptx-from-excel used before excel_reader."""
+    import pandas as pd
+
+    def normalize_cell(cell):
+        if isinstance(cell, (pd.Timestamp, datetime)):
+            return cell.strftime("%d/%m/%Y")
+        return str(cell).strip()
+
+    df_raw = pd.read_excel(io.BytesIO(excel_content), header=None)
+    title = str(df_raw.iloc[0, 0]).strip()
+    columns = df_raw.iloc[1].astype(str).tolist()
+    body = df_raw.iloc[2:].dropna(how="all")
+    body = body.map(normalize_cell) if hasattr(body, "map") else body.applymap(normalize_cell)
+    return title, columns, body.values.tolist()
+
+
+def best_of(fn, arg, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(arg)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(sizes):
+    try:
+        import pandas  # noqa: F401
+        have_pandas = True
+    except ImportError:
+        have_pandas = False
+
+    print(f"{'rows':>8} {'reader ms':>12} {'pandas ms':>12} {'speedup':>8}")
+    for rows in sizes:
+        blob = make_workbook(rows)
+        repeat = 5 if rows <= 1000 else 1
+        fast = best_of(read_workbook, blob, repeat)
+        if have_pandas:
+            slow = best_of(read_with_pandas, blob, repeat)
+            print(f"{rows:>8} {fast * 1000:>12.1f} {slow * 1000:>12.1f} {slow / fast:>7.1f}x")
+        else:
+            print(f"{rows:>8} {fast * 1000:>12.1f} {'-':>12} {'-':>8}")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [10, 500, 50000])
@@ -0,0 +1,243 @@
+"""Time every phase of deck generation on synthetic workloads and flag regressions.
+
+Run from pptx-backend/:
+    python benchmarks/bench_pipeline.py [--rows 5 50 500 5000] [--xlsx]
+        [--save results.json] [--baseline results.json] [--threshold 0.2]
+
+Each case builds a synthetic request (and with --xlsx an uploaded workbook)
+with varied cell lengths inside the template limits, then runs it the way
+the API does: validation, generate_pptx and save, all in this process. Time
+per phase comes from the `phases` hooks in the pipeline, best of --repeat
+runs. Peak memory is the growth of the peak RSS over one run in a fresh
+process, after loading the templates and a small warm-up deck; most of a
+deck's memory is lxml's (C) trees, which tracemalloc would not see.
+
+--save writes the results as JSON; --baseline compares against such a file
+and exits with 1 when a total, phase or memory peak grew by more than
+--threshold (and, for times, by more than --min-ms). Baselines are only
+comparable on the same machine.
+"""
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+from deck_writer import deck_bytes
+from phases import add_phase_listener, remove_phase_listener
+from validation import validate_request
+
+
+HEADERS = ["Sl no.", "Brief about change", "What is the impact", "Dev effort", "Remarks", "Gone Live/ETA", "Status"]
+STATUSES = ["Action Over", "In Progress", "Not as per Plan", "Yet to Start", "Completed", "delayed", "on hold"]
+WORDS = (
+    "api migration rollout latency dashboard payments vendor onboarding ledger reconciliation "
+    "sync batch retry timeout customer mobile release hotfix audit compliance report kyc loan "
+    "disbursal collection partner integration sla escalation monitoring alerting"
+).split()
+# Phases in pipeline order; "borders" only runs with the proxy renderer and
+# is part of "table" there
+PHASES = ["excel_parse", "validate", "template", "row_heights", "paginate", "slides", "table", "borders",
+          "circles", "manifest", "save"]
+
+
+def text(rng, max_len):
+    """Words up to a length drawn from 0..max_len, biased towards short cells."""
+    target = int(max_len * rng.random() ** 1.5)
+    out = ""
+    while True:
+        word = rng.choice(WORDS)
+        if len(out) + len(word) + 1 > target:
+            return out
+        out = f"{out} {word}" if out else word
+
+
+def make_rows(rows, seed=0):
+    rng = random.Random(seed)
+    limits = app.column_limits
+    return [
+        [
+            str(i + 1),
+            text(rng, limits["brief about change"]),
+            text(rng, limits["what is the impact"]),
+            rng.choice(["S", "M", "L", "XL"]),
+            text(rng, limits["remarks"]),
+            f"{1 + i % 28:02d}/{1 + i % 12:02d}/2026",
+            rng.choice(STATUSES),
+        ]
+        for i in range(rows)
+    ]
+
+
+def make_request(rows):
+    return app.PPTXRequest(type="project_update", title=f"Benchmark {rows} rows", columns=HEADERS,
+                           content=make_rows(rows))
+
+
+def make_workbook(rows):
+    from openpyxl import Workbook
+
+    wb = Workbook()
+    ws = wb.active
+    ws["A1"] = f"Benchmark {rows} rows"
+    ws.merge_cells("A1:G1")
+    ws.append(HEADERS)
+    for row in make_rows(rows):
+        ws.append(row)
+    out = io.BytesIO()
+    wb.save(out)
+    return out.getvalue()
+
+
+def run_json(request):
+    validate_request(request.columns, request.content, app.column_limits)
+    return deck_bytes(app.generate_pptx(request))
+
+
+def run_xlsx(blob):
+    return deck_bytes(app.generate_pptx(app.parse_excel_request(blob)))
+
+
+def measure(fn, arg, repeat):
+    """(total seconds, {phase: seconds}) of the fastest of `repeat` runs."""
+    best = None
+    for _ in range(repeat):
+        phases = defaultdict(float)
+
+        def record(name, start, end, attributes):
+            phases[name] += end - start
+
+        add_phase_listener(record)
+        try:
+            start = time.perf_counter()
+            fn(arg)
+            total = time.perf_counter() - start
+        finally:
+            remove_phase_listener(record)
+        if best is None or total < best[0]:
+            best = (total, dict(phases))
+    return best
+
+
+CASES = {"json": (run_json, make_request), "xlsx": (run_xlsx, make_workbook)}
+
+
+def _max_rss_kb():
+    # Linux's VmHWM is this process's own; ru_maxrss there carries over the
+    # peak of the process it was exec'd from (this one, already grown)
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == "darwin" else rss  # bytes on macOS, KiB elsewhere
+
+
+def _rss_growth(kind, rows):
+    fn, make = CASES[kind]
+    app.template_cache.load_all()
+    fn(make(5))
+    arg = make(rows)
+    before = _max_rss_kb()
+    fn(arg)
+    return _max_rss_kb() - before
+
+
+def peak_rss_kb(kind, rows):
+    """KiB the peak RSS grows by while one case runs, in a process of its own."""
+    with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return pool.submit(_rss_growth, kind, rows).result()
+
+
+def run_case(kind, rows, repeat):
+    fn, make = CASES[kind]
+    arg = make(rows)
+    fn(arg)  # warm caches (templates, font metrics, ...)
+    total, phases = measure(fn, arg, repeat)
+    return {
+        "total_ms": round(total * 1000, 2),
+        "phases_ms": {p: round(phases[p] * 1000, 2) for p in PHASES if p in phases},
+        "peak_rss_kb": peak_rss_kb(kind, rows),
+    }
+
+
+def print_results(results):
+    shown = [p for p in PHASES if any(p in r["phases_ms"] for r in results.values())]
+    print(f"{'case':<12} {'total ms':>10} " + " ".join(f"{p[:11]:>11}" for p in shown) + f" {'+RSS KiB':>10}")
+    for name, r in results.items():
+        cells = " ".join(f"{r['phases_ms'].get(p, 0):>11.1f}" for p in shown)
+        print(f"{name:<12} {r['total_ms']:>10.1f} {cells} {r['peak_rss_kb']:>10}")
+
+
+def compare(results, baseline, threshold, min_ms):
+    """Print metrics that regressed beyond `threshold`; returns how many did."""
+    regressions = 0
+    for name, r in results.items():
+        old = baseline.get(name)
+        if old is None:
+            continue
+        metrics = [("total", r["total_ms"], old["total_ms"], min_ms)]
+        metrics += [(p, ms, old["phases_ms"].get(p), min_ms) for p, ms in r["phases_ms"].items()]
+        # baselines saved before peak RSS was measured have no comparable figure
+        metrics.append(("peak RSS KiB", r["peak_rss_kb"], old.get("peak_rss_kb"), 0))
+        for metric, new_value, old_value, floor in metrics:
+            if not old_value:
+                continue
+            if new_value > old_value * (1 + threshold) and new_value - old_value > floor:
+                regressions += 1
+                print(f"REGRESSION {name} {metric}: {old_value} -> {new_value} ({new_value / old_value - 1:+.0%})")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[5, 50, 500, 5000])
+    parser.add_argument("--xlsx", action="store_true", help="also run each size as a workbook upload")
+    parser.add_argument("--repeat", type=int, help="runs per case (default: 5, 1 above 1000 rows)")
+    parser.add_argument("--save", metavar="FILE", help="write results as JSON")
+    parser.add_argument("--baseline", metavar="FILE", help="compare against results saved earlier")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed growth, 0.2 = 20%%")
+    parser.add_argument("--min-ms", type=float, default=5.0, help="ignore time growth below this")
+    args = parser.parse_args(argv)
+
+    app.template_cache.load_all()
+    results = {}
+    for rows in args.rows:
+        repeat = args.repeat or (5 if rows <= 1000 else 1)
+        results[f"json-{rows}"] = run_case("json", rows, repeat)
+        if args.xlsx:
+            results[f"xlsx-{rows}"] = run_case("xlsx", rows, repeat)
+    print_results(results)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "renderer": app.table_renderer,
+                "results": results,
+            }, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold, args.min_ms)
+        print(f"{regressions} regression(s) against {args.baseline}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
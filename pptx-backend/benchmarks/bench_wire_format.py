@@ -0,0 +1,93 @@
+"""Parse cost of a /generate-pptx body per wire format, per 10k cells.
+
+Run from pptx-backend/:  python benchmarks/bench_wire_format.py [cells ...]
+
+"pydantic" is the old path (json.loads, then PPTXRequest validation, as
+FastAPI did it); the others go through wire_format.parse_deck_request.
+MessagePack rows need the msgpack package and are skipped without it.
+"""
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import wire_format
+from app import PPTXRequest
+from wire_format import parse_deck_request
+
+
+HEADERS = ["Sl no.", "Brief about change", "What is the impact", "Dev effort", "Remarks", "Gone Live/ETA", "Status"]
+STATUSES = ["Action Over", "In Progress", "Not as per Plan", "Yet to Start"]
+
+
+def make_rows(cells):
+    return [
+        [
+            str(i + 1),
+            "Brief about change " * (1 + i % 4),
+            "Impact " * (1 + i % 6),
+            "M",
+            "Remark " * (i % 5),
+            f"{1 + i % 28:02d}/{1 + i % 12:02d}/2026",
+            STATUSES[i % 4],
+        ]
+        for i in range(max(cells // len(HEADERS), 1))
+    ]
+
+
+def bodies(cells):
+    """{format: (body bytes, parse function)} for the same deck."""
+    rows = make_rows(cells)
+    request = {"type": "project_update", "title": "Benchmark", "columns": HEADERS, "content": rows}
+    columnar = {"type": "project_update", "title": "Benchmark", "columns": HEADERS,
+                "data": {name: [row[c] for row in rows] for c, name in enumerate(HEADERS)}}
+    json_rows = json.dumps(request).encode()
+    formats = {
+        "pydantic": (json_rows, lambda body: PPTXRequest.model_validate(json.loads(body))),
+        "json rows": (json_rows, lambda body: parse_deck_request(body, "application/json")),
+        "json columnar": (json.dumps(columnar).encode(), lambda body: parse_deck_request(body, "application/json")),
+    }
+    if wire_format.msgpack is not None:
+        packb = wire_format.msgpack.packb
+        formats["msgpack rows"] = (packb(request), lambda body: parse_deck_request(body, "application/msgpack"))
+        formats["msgpack columnar"] = (packb(columnar), lambda body: parse_deck_request(body, "application/msgpack"))
+    return formats
+
+
+def best_of(fn, arg, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(arg)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def peak_memory(fn, arg):
+    tracemalloc.start()
+    try:
+        fn(arg)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main(sizes):
+    print(f"JSON decoder: {'orjson' if wire_format.orjson is not None else 'json (stdlib)'}; "
+          f"msgpack: {'yes' if wire_format.msgpack is not None else 'not installed'}")
+    print(f"{'cells':>8} {'format':<18} {'body KiB':>9} {'ms':>9} {'ms/10k cells':>13} {'peak KiB':>9}")
+    for cells in sizes:
+        n = len(make_rows(cells)) * len(HEADERS)
+        repeat = 20 if n <= 100_000 else 3
+        for name, (body, parse) in bodies(cells).items():
+            t = best_of(parse, body, repeat)
+            peak = peak_memory(parse, body)
+            print(f"{n:>8} {name:<18} {len(body) / 1024:>9.0f} {t * 1000:>9.2f} {t * 1000 * 10_000 / n:>13.2f} "
+                  f"{peak / 1024:>9.0f}")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [10_000, 100_000])
@@ -0,0 +1,78 @@
+"""Import-time and memory report for starting an API worker.
+
+Run from pptx-backend/:  python benchmarks/startup_report.py [module] [--top N]
+
+Imports `module` (default: app) in a fresh interpreter with `-X importtime`,
+then prints the cumulative import cost per top-level package and the
+worker's peak RSS right after import. Use it to keep heavy dependencies
+(openpyxl, numpy, pandas, ...) off the startup path.
+"""
+import argparse
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = (
+    "import resource, sys, time\n"
+    "start = time.perf_counter()\n"
+    "import {module}\n"
+    "elapsed = time.perf_counter() - start\n"
+    "print(f'{{elapsed * 1000:.1f}} {{resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}}')\n"
+)
+
+
+def parse_importtime(stderr):
+    """Yield (depth, self_us, cumulative_us, module) from `-X importtime` output."""
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line.split(":", 1)[1].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        yield depth, int(self_us), int(cumulative_us), name.strip()
+
+
+def package_breakdown(stderr, module):
+    """Cumulative microseconds per top-level package imported directly by `module`."""
+    packages = defaultdict(int)
+    pending = []
+    # importtime prints children before their parent, so collect the direct
+    # children seen since the previous top-level import and keep them when
+    # the parent turns out to be `module`
+    for depth, _, cumulative_us, name in parse_importtime(stderr):
+        if depth == 1:
+            pending.append((name, cumulative_us))
+        elif depth == 0:
+            if name == module:
+                for child, us in pending:
+                    packages[child.split(".")[0]] += us
+            pending = []
+    return packages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("module", nargs="?", default="app")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE.format(module=args.module)],
+        cwd=BACKEND_DIR, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        sys.exit(proc.stderr)
+    elapsed_ms, maxrss_kb = proc.stdout.split()
+
+    packages = package_breakdown(proc.stderr, args.module)
+    print(f"import {args.module}: {float(elapsed_ms):.1f} ms, peak RSS {int(maxrss_kb) / 1024:.1f} MiB\n")
+    print(f"{'package':<28} {'ms':>9}")
+    for name, us in sorted(packages.items(), key=lambda kv: -kv[1])[:args.top]:
+        print(f"{name:<28} {us / 1000:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
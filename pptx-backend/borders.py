@@ -0,0 +1,47 @@
+from copy import deepcopy
+from functools import lru_cache
+
+from pptx.oxml import parse_xml
+from pptx.oxml.ns import qn, nsdecls
+
+
+ALL_SIDES = ("lnL", "lnR", "lnT", "lnB")
+HEADER_SIDES = ("lnL", "lnR", "lnB")  # header has no top border
+
+
+@lru_cache(maxsize=None)
+def line_element(side, rgb=(0, 0, 0), width_emu="19050"):
+    """Parse a single `a:lnX` border element once; callers attach deepcopies."""
+    r, g, b = rgb
+    hex_color = f"{r:02X}{g:02X}{b:02X}"
+    return parse_xml(
+        f'<a:{side} {nsdecls("a")} w="{width_emu}" cap="flat" cmpd="sng" algn="ctr">'
+        f' <a:solidFill><a:srgbClr val="{hex_color}"/></a:solidFill>'
+        f' <a:prstDash val="solid"/>'
+        f'</a:{side}>'
+    )
+
+
+@lru_cache(maxsize=None)
+def _border_set(sides, rgb, width_emu):
+    return tuple((qn(f"a:{side}"), line_element(side, rgb, width_emu)) for side in sides)
+
+
+def apply_border(tcPr, sides=ALL_SIDES, rgb=(0, 0, 0), width_emu="19050"):
+    """Replace the given border sides of a `a:tcPr` element."""
+    for tag, line in _border_set(tuple(sides), tuple(rgb), str(width_emu)):
+        existing_ln = tcPr.find(tag)
+        if existing_ln is not None:
+            tcPr.remove(existing_ln)
+        tcPr.append(deepcopy(line))
+
+
+def apply_table_borders(tbl, rgb=(0, 0, 0), width_emu="19050", header_sides=HEADER_SIDES, body_sides=ALL_SIDES):
+    """Apply borders to every cell of an `a:tbl` element in one pass.
+
+    The first row gets `header_sides`, all other rows get `body_sides`.
+    """
+    for r, tr in enumerate(tbl.tr_lst):
+        sides = header_sides if r == 0 else body_sides
+        for tc in tr.tc_lst:
+            apply_border(tc.get_or_add_tcPr(), sides, rgb, width_emu)
@@ -0,0 +1,72 @@
+import io
+import os
+import zipfile
+
+from pptx.opc.oxml import serialize_part_xml
+from pptx.opc.packuri import CONTENT_TYPES_URI, PACKAGE_URI
+
+try:
+    from pptx.opc.serialized import _ContentTypesItem
+except ImportError:  # not python-pptx 1.0.x: decks are written whole by prs.save
+    _ContentTypesItem = None
+
+from metrics import deck_size
+from phases import phase
+from zip_stream import ZipStream
+
+
+# Deflate level for saved decks: 0 stores parts uncompressed (least CPU, but
+# slide XML shrinks ~15x when deflated), 1-9 trade CPU for size; python-pptx uses 6
+DECK_COMPRESSLEVEL = int(os.getenv("PPTX_ZIP_COMPRESSLEVEL", "6"))
+
+
+def iter_deck(prs, compresslevel=DECK_COMPRESSLEVEL):
+    """Yield the .pptx file of `prs` in chunks, the way `prs.save` writes it.
+
+    Each part is serialized and compressed only when its turn comes, so the
+    first chunks can go out while later slides are still being written, and
+    no complete copy of the file is built up here.
+    """
+    size = 0
+    for chunk in _deck_chunks(prs, compresslevel):
+        size += len(chunk)
+        yield chunk
+    deck_size.observe(size)
+
+
+def _deck_chunks(prs, compresslevel):
+    package = prs.part.package
+    if _ContentTypesItem is None or not hasattr(package, "_rels"):
+        out = io.BytesIO()
+        prs.save(out)
+        yield out.getvalue()
+        return
+    parts = tuple(package.iter_parts())
+    if compresslevel:
+        archive = ZipStream(zipfile.ZIP_DEFLATED, compresslevel)
+    else:
+        archive = ZipStream()
+
+    yield archive.add(CONTENT_TYPES_URI.membername, serialize_part_xml(_ContentTypesItem.xml_for(parts)))
+    yield archive.add(PACKAGE_URI.rels_uri.membername, package._rels.xml)
+    for part in parts:
+        yield archive.add(part.partname.membername, part.blob)
+        if part._rels:
+            yield archive.add(part.partname.rels_uri.membername, part.rels.xml)
+    yield archive.close()
+
+
+def deck_bytes(prs, compresslevel=DECK_COMPRESSLEVEL):
+    """The whole .pptx file of `prs`."""
+    out = io.BytesIO()
+    with phase("save") as attributes:
+        for chunk in iter_deck(prs, compresslevel):
+            out.write(chunk)
+        attributes["bytes"] = out.tell()
+    return out.getvalue()
+
+
+def deck_slide_count(deck: bytes):
+    """Slides in the saved deck `deck`, read off its zip directory."""
+    with zipfile.ZipFile(io.BytesIO(deck)) as archive:
+        return sum(name.startswith("ppt/slides/slide") and name.endswith(".xml") for name in archive.namelist())
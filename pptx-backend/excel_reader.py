@@ -0,0 +1,196 @@
+import io
+import posixpath
+import zipfile
+from datetime import datetime
+from functools import lru_cache
+
+from fastapi import HTTPException
+from lxml import etree
+from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format
+from openpyxl.utils.datetime import CALENDAR_MAC_1904, CALENDAR_WINDOWS_1900, from_excel
+
+
+_MAIN = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_REL = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_PKG_REL = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+_DIGITS = "0123456789"
+
+
+def normalize_cell(cell):
+    if cell is None:
+        return ""
+    if isinstance(cell, datetime):
+        return cell.strftime("%d/%m/%Y")  # exactly 10 chars
+    return str(cell).strip()
+
+
+@lru_cache(maxsize=1024)
+def _column_index(letters):
+    """Zero-based column index of column letters such as "F" or "AB"."""
+    idx = 0
+    for ch in letters:
+        idx = idx * 26 + ord(ch) - 64
+    return idx - 1
+
+
+def _text(el):
+    """Concatenated text of the `t` runs of a shared/inline string, skipping phonetic runs."""
+    if len(el) == 1 and el[0].tag == f"{_MAIN}t":  # plain string: a single <t>
+        return el[0].text or ""
+    return "".join(t.text or "" for t in el.iter(f"{_MAIN}t") if t.getparent().tag != f"{_MAIN}rPh")
+
+
+class _Workbook:
+    """Just enough of an xlsx package to stream cell values from one sheet."""
+
+    def __init__(self, excel_content: bytes):
+        try:
+            self.zip = zipfile.ZipFile(io.BytesIO(excel_content))
+            workbook = etree.fromstring(self.zip.read("xl/workbook.xml"))
+        except (zipfile.BadZipFile, KeyError, etree.XMLSyntaxError):
+            raise HTTPException(status_code=400, detail="File is not a valid .xlsx workbook.")
+
+        pr = workbook.find(f"{_MAIN}workbookPr")
+        self.epoch = CALENDAR_MAC_1904 if pr is not None and pr.get("date1904") in ("1", "true") else CALENDAR_WINDOWS_1900
+
+        rels = etree.fromstring(self.zip.read("xl/_rels/workbook.xml.rels"))
+        targets = {rel.get("Id"): rel.get("Target") for rel in rels.iter(f"{_PKG_REL}Relationship")}
+        self.sheets = []  # (name, part name)
+        for sheet in workbook.iter(f"{_MAIN}sheet"):
+            target = targets[sheet.get(f"{_REL}id")]
+            partname = target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join("xl", target))
+            self.sheets.append((sheet.get("name"), partname))
+
+        self.shared_strings = self._read_shared_strings()
+        self.date_styles = self._read_date_styles()
+
+    def _read_shared_strings(self):
+        try:
+            data = self.zip.read("xl/sharedStrings.xml")
+        except KeyError:
+            return []
+        return [_text(si) for si in etree.fromstring(data).iter(f"{_MAIN}si")]
+
+    def _read_date_styles(self):
+        """Indexes of cellXfs entries whose number format displays a date."""
+        try:
+            styles = etree.fromstring(self.zip.read("xl/styles.xml"))
+        except KeyError:
+            return frozenset()
+        formats = dict(BUILTIN_FORMATS)
+        for fmt in styles.iter(f"{_MAIN}numFmt"):
+            formats[int(fmt.get("numFmtId"))] = fmt.get("formatCode")
+        cell_xfs = styles.find(f"{_MAIN}cellXfs")
+        if cell_xfs is None:
+            return frozenset()
+        return frozenset(
+            i for i, xf in enumerate(cell_xfs)
+            if is_date_format(formats.get(int(xf.get("numFmtId", 0)), "General"))
+        )
+
+    def _value(self, c):
+        kind = c.get("t", "n")
+        if kind == "inlineStr":
+            is_ = c.find(f"{_MAIN}is")
+            return None if is_ is None else _text(is_)
+        v = c.find(f"{_MAIN}v")
+        if v is None or v.text is None:
+            return None
+        text = v.text
+        if kind == "s":
+            return self.shared_strings[int(text)]
+        if kind == "b":
+            return text == "1"
+        if kind in ("str", "e"):
+            return text
+        if kind == "d":
+            return datetime.fromisoformat(text.rstrip("Z"))
+        number = float(text) if ("." in text or "E" in text or "e" in text) else int(text)
+        style = c.get("s")
+        if style is not None and int(style) in self.date_styles:
+            return from_excel(number, self.epoch)
+        return number
+
+    def iter_rows(self, partname):
+        """Yield (row number, [values]) for every row element present in the sheet."""
+        with self.zip.open(partname) as f:
+            next_row = 1
+            for _, row in etree.iterparse(f, tag=f"{_MAIN}row", huge_tree=True):
+                r = row.get("r")
+                row_number = int(r) if r else next_row
+                next_row = row_number + 1
+                values = []
+                for c in row.iterchildren(f"{_MAIN}c"):
+                    ref = c.get("r")
+                    if ref:
+                        col = _column_index(ref.rstrip(_DIGITS))
+                        if col > len(values):
+                            values.extend([None] * (col - len(values)))
+                    values.append(self._value(c))
+                yield row_number, values
+                # keep memory flat on big sheets
+                row.clear()
+                while row.getprevious() is not None:
+                    del row.getparent()[0]
+
+
+def _read_sheet(wb, partname):
+    """(title, columns, content) of a sheet; columns is None when it has no header row."""
+    title = ""
+    columns = None
+    content = []
+    width = 0
+    for row_number, values in wb.iter_rows(partname):
+        if row_number == 1:
+            title = normalize_cell(values[0] if values else None)
+        elif row_number == 2:
+            columns = ["" if v is None else str(v) for v in values]
+            while columns and not columns[-1]:
+                columns.pop()
+            width = len(columns)
+        elif row_number > 2 and columns is not None:
+            values = values[:width]
+            if all(v is None for v in values):
+                continue
+            cells = [normalize_cell(v) for v in values]
+            if len(cells) < width:
+                cells.extend([""] * (width - len(cells)))
+            content.append(cells)
+    return title, columns, content
+
+
+def read_sheet(wb, partname):
+    """Return (title, columns, content) from a project update sheet.
+
+    Layout: row 1 is the (merged) title, row 2 the headers, data from row 3.
+    Rows are streamed straight from the sheet XML and normalized inline; fully
+    empty rows are skipped and nothing past the last written row is visited.
+    """
+    title, columns, content = _read_sheet(wb, partname)
+    if columns is None:
+        raise HTTPException(status_code=400, detail="Workbook must have a title row and a header row.")
+    return title, columns, content
+
+
+def read_workbook(excel_content: bytes):
+    """Read the first sheet of an uploaded workbook, see `read_sheet`."""
+    wb = _Workbook(excel_content)
+    if not wb.sheets:
+        raise HTTPException(status_code=400, detail="Workbook has no sheets.")
+    return read_sheet(wb, wb.sheets[0][1])
+
+
+def read_workbook_sheets(excel_content: bytes):
+    """[(sheet name, title, columns, content)] for every sheet laid out like `read_sheet`.
+
+    Sheets without a header row (blank or helper sheets) are left out.
+    """
+    wb = _Workbook(excel_content)
+    sheets = []
+    for name, partname in wb.sheets:
+        title, columns, content = _read_sheet(wb, partname)
+        if columns is not None:
+            sheets.append((name, title, columns, content))
+    if not sheets:
+        raise HTTPException(status_code=400, detail="Workbook has no sheet with a title row and a header row.")
+    return sheets
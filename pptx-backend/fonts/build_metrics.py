@@ -0,0 +1,71 @@
+"""Build a glyph advance-width table for text_metrics from a TTF/OTF or AFM file.
+
+Run from pptx-backend/:
+    python fonts/build_metrics.py /path/to/Carlito-Regular.ttf fonts/calibri.json
+    python fonts/build_metrics.py /path/to/Helvetica.afm fonts/helvetica.json
+
+TTF/OTF input needs fontTools (dev-only; the server just reads the JSON).
+Carlito is metric-compatible with Calibri, the theme font of our templates.
+"""
+import json
+import os
+import sys
+
+
+# Latin-1 plus the typographic punctuation Office likes to autocorrect to
+CODEPOINTS = list(range(32, 127)) + list(range(160, 256)) + [ord(ch) for ch in "–—‘’‚“”„•…€™"]
+
+
+def from_ttf(path):
+    from fontTools.ttLib import TTFont
+
+    font = TTFont(path)
+    cmap = font.getBestCmap()
+    hmtx = font["hmtx"]
+    widths = {cp: hmtx[cmap[cp]][0] for cp in CODEPOINTS if cp in cmap}
+    family = font["name"].getDebugName(1)
+    return family, font["head"].unitsPerEm, widths
+
+
+def from_afm(path):
+    """Parse `C <code> ; WX <width> ; N <name> ;` lines (AFM fonts use 1000 units/em)."""
+    family = os.path.splitext(os.path.basename(path))[0]
+    widths = {}
+    with open(path, encoding="latin-1") as f:
+        for line in f:
+            if line.startswith("FamilyName "):
+                family = line.split(None, 1)[1].strip()
+            if not line.startswith("C "):
+                continue
+            fields = dict(part.strip().split(None, 1) for part in line.split(";") if part.strip())
+            code = int(fields["C"])
+            if code >= 32:
+                widths[code] = int(float(fields["WX"]))
+    return family, 1000, widths
+
+
+def write_metrics(out_path, family, units_per_em, widths, source):
+    default_width = widths.get(ord("0")) or round(sum(widths.values()) / len(widths))
+    with open(out_path, "w") as f:
+        f.write("{\n")
+        f.write(f'  "family": {json.dumps(family)},\n')
+        f.write(f'  "source": {json.dumps(source)},\n')
+        f.write(f'  "units_per_em": {units_per_em},\n')
+        f.write(f'  "default_width": {default_width},\n')
+        f.write(f'  "widths": {json.dumps({str(cp): w for cp, w in sorted(widths.items())}, separators=(",", ":"))}\n')
+        f.write("}\n")
+
+
+def main(src, out_path):
+    if src.lower().endswith(".afm"):
+        family, units_per_em, widths = from_afm(src)
+    else:
+        family, units_per_em, widths = from_ttf(src)
+    write_metrics(out_path, family, units_per_em, widths, os.path.basename(src))
+    print(f"{out_path}: {family}, {len(widths)} glyphs, {units_per_em} units/em")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        sys.exit(__doc__)
+    main(sys.argv[1], sys.argv[2])
@@ -0,0 +1,115 @@
+import hashlib
+import io
+import json
+import zipfile
+import zlib
+
+from lxml import etree
+from pptx.opc.constants import CONTENT_TYPE as CT
+from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+from pptx.opc.package import Part
+from pptx.opc.packuri import PackURI
+
+from slide_clone import freeze_slide
+
+
+# Bump when a code change alters slide XML for the same inputs, so decks made
+# before it are never reused
+LAYOUT_VERSION = 2
+# Custom document property (docProps/custom.xml) holding a deck's layout manifest
+LAYOUT_PROPERTY = "PptxLayout"
+
+_CUSTOM_PROPS_URI = "/docProps/custom.xml"
+_CUSTOM_NS = "http://schemas.openxmlformats.org/officeDocument/2006/custom-properties"
+_VT_NS = "http://schemas.openxmlformats.org/officeDocument/2006/docPropsVTypes"
+_FMTID = "{D5CDD505-2E9C-101B-9397-08002B2CF9AE}"
+_EMPTY_PROPS = f'<Properties xmlns="{_CUSTOM_NS}" xmlns:vt="{_VT_NS}"/>'.encode()
+
+
+def layout_key(*parts):
+    """Hash of everything besides its rows that shapes a slide (template, title, settings...)."""
+    return hashlib.sha256(json.dumps([LAYOUT_VERSION, *parts], ensure_ascii=False).encode()).hexdigest()[:32]
+
+
+def page_hashes(layout, chunks, headers):
+    """One hash per slide: its rows, whether it has a header row, and `layout`."""
+    return [
+        hashlib.sha256(json.dumps([layout, header, chunk], ensure_ascii=False).encode()).hexdigest()[:16]
+        for chunk, header in zip(chunks, headers)
+    ]
+
+
+def slide_digest(xml):
+    """Hash of a slide's saved XML, recorded in the manifest to detect edited slides."""
+    return hashlib.sha256(xml).hexdigest()[:32]
+
+
+def reused_pages(previous, layout, hashes):
+    """{page index: previous slide index} for the slides that can be copied from `previous`.
+
+    `previous` is a manifest as written by `write_manifest`. The first slide
+    is always rebuilt: it is the template's own slide, with relationships
+    (notes) the copies don't have.
+    """
+    if not previous or previous.get("layout") != layout:
+        return {}
+    earlier = {h: i for i, h in enumerate(previous["pages"]) if i > 0}
+    return {i: earlier[h] for i, h in enumerate(hashes) if i > 0 and h in earlier}
+
+
+def write_manifest(prs, layout, hashes):
+    """Store the layout manifest of `prs` as a custom document property.
+
+    Besides the page hashes it records a `slide_digest` of each slide's XML,
+    so a slide changed after saving (by hand, or by PowerPoint) is not reused.
+    The slides are frozen to the XML hashed, so they must be finished.
+    """
+    package = prs.part.package
+    try:
+        part = package.part_related_by(RT.CUSTOM_PROPERTIES)
+    except KeyError:
+        part = Part(PackURI(_CUSTOM_PROPS_URI), CT.OFC_CUSTOM_PROPERTIES, package, _EMPTY_PROPS)
+        package.relate_to(part, RT.CUSTOM_PROPERTIES)
+
+    props = etree.fromstring(part.blob)
+    slides = [slide_digest(freeze_slide(slide)) for slide in prs.slides]
+    value = json.dumps({"layout": layout, "pages": hashes, "slides": slides}, separators=(",", ":"))
+    for prop in props.iterchildren(f"{{{_CUSTOM_NS}}}property"):
+        if prop.get("name") == LAYOUT_PROPERTY:
+            prop[0].text = value
+            break
+    else:
+        pid = max((int(p.get("pid")) for p in props.iterchildren(f"{{{_CUSTOM_NS}}}property")), default=1) + 1
+        prop = etree.SubElement(props, f"{{{_CUSTOM_NS}}}property", fmtid=_FMTID, pid=str(pid), name=LAYOUT_PROPERTY)
+        etree.SubElement(prop, f"{{{_VT_NS}}}lpwstr").text = value
+    part.blob = etree.tostring(props, xml_declaration=True, encoding="UTF-8", standalone=True)
+
+
+class PreviousDeck:
+    """A deck generated earlier, read just enough to copy unchanged slides from it."""
+
+    def __init__(self, deck: bytes):
+        self.manifest = None
+        try:
+            self._zip = zipfile.ZipFile(io.BytesIO(deck))
+            props = etree.fromstring(self._zip.read(_CUSTOM_PROPS_URI.lstrip("/")))
+        except (zipfile.BadZipFile, KeyError, etree.XMLSyntaxError):
+            return
+        for prop in props.iterchildren(f"{{{_CUSTOM_NS}}}property"):
+            if prop.get("name") == LAYOUT_PROPERTY:
+                self.manifest = json.loads(prop[0].text)
+
+    def slide_xml(self, index):
+        """Serialized XML of the `index`th slide (saved decks name slides in order).
+
+        None when the slide is missing or unreadable, or no longer matches
+        the digest in the manifest; the caller then renders it afresh.
+        """
+        digests = self.manifest.get("slides") or []
+        try:
+            xml = self._zip.read(f"ppt/slides/slide{index + 1}.xml")
+        except (KeyError, zipfile.BadZipFile, zlib.error):
+            return None
+        if index >= len(digests) or slide_digest(xml) != digests[index]:
+            return None
+        return xml
@@ -0,0 +1,368 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from functools import partial
+
+from fastapi import HTTPException
+
+from metrics import count_error
+
+try:
+    import fcntl
+except ImportError:  # not POSIX: unfinished jobs of exited processes are left to expire
+    fcntl = None
+
+
+# "memory" keeps jobs in this process; "sqlite" shares them (and their results)
+# between API processes on a host and keeps them across restarts (jobs still
+# queued or running when their process exits are marked failed)
+JOB_STORE = os.getenv("PPTX_JOB_STORE", "memory")
+JOB_DB = os.getenv("PPTX_JOB_DB", "jobs.sqlite3")
+# Seconds a job and its result are kept after it finishes
+JOB_TTL = float(os.getenv("PPTX_JOB_TTL", "3600"))
+# Bytes of results the memory store holds; past it the oldest finished jobs go first
+JOB_RESULT_BYTES = int(os.getenv("PPTX_JOB_RESULT_BYTES", str(256 * 1024 * 1024)))
+# Jobs rendering at once; the rest wait their turn in the queue
+JOB_CONCURRENCY = int(os.getenv("PPTX_JOB_CONCURRENCY", "2"))
+# Unfinished jobs accepted before new ones are turned away with 503
+JOB_QUEUE_LIMIT = int(os.getenv("PPTX_JOB_QUEUE_LIMIT", "100"))
+# Seconds a job waits before retrying when the render pool is full
+JOB_RETRY_DELAY = float(os.getenv("PPTX_JOB_RETRY_DELAY", "0.5"))
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+logger = logging.getLogger(__name__)
+
+# Error of a job whose process exited before it finished
+INTERRUPTED = {"status_code": 500, "detail": "The server stopped before the job finished. Please submit it again."}
+
+
+class MemoryJobStore:
+    """Jobs as dicts in this process; results are kept beside them.
+
+    Results are held to `max_bytes` in all: finishing a job drops the jobs
+    that finished first (results and all) until its result fits, as if they
+    had expired; a result larger than `max_bytes` expires at once.
+    """
+
+    def __init__(self, max_bytes=JOB_RESULT_BYTES):
+        self.max_bytes = max_bytes
+        self._jobs = {}
+        self._results = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def put(self, job):
+        with self._lock:
+            self._jobs[job["id"]] = dict(job)
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def update(self, job_id, **fields):
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields)
+
+    def finish(self, job_id, result, **fields):
+        with self._lock:
+            if job_id not in self._jobs:
+                return
+            if len(result) > self.max_bytes:  # could never be kept
+                del self._jobs[job_id]
+                return
+            self._jobs[job_id].update(fields)
+            self._results[job_id] = result
+            self._size += len(result)
+            while self._size > self.max_bytes:
+                evicted, old = self._results.popitem(last=False)
+                self._size -= len(old)
+                del self._jobs[evicted]
+
+    def result(self, job_id):
+        with self._lock:
+            return self._results.get(job_id)
+
+    def count_unfinished(self):
+        with self._lock:
+            return sum(job["status"] in (QUEUED, RUNNING) for job in self._jobs.values())
+
+    def evict(self, before):
+        """Drop jobs last touched (finished, else created) before `before`."""
+        with self._lock:
+            expired = [
+                job_id for job_id, job in self._jobs.items()
+                if (job["finished"] or job["created"]) < before
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
+                result = self._results.pop(job_id, None)
+                if result is not None:
+                    self._size -= len(result)
+
+
+def _take_lease(path):
+    """Lock file at `path`, held for as long as this process lives (the OS drops the lock with it)."""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    f = open(tmp, "w")
+    fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    os.replace(tmp, path)  # only ever seen locked
+    return f
+
+
+def _lease_held(path):
+    """Whether the process that took the lease at `path` is still running."""
+    try:
+        with open(path) as f:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except FileNotFoundError:
+        return False
+    except BlockingIOError:
+        return True
+    return False
+
+
+class SqliteJobStore:
+    """Jobs in a local SQLite file, results as blobs.
+
+    Each job records the store (`owner`, one per process) that runs it. A
+    process holds a lease file beside the database while it lives, so the
+    unfinished jobs of one that has exited can be told apart and failed:
+    when a store opens, on each eviction and when such a job is read.
+    """
+
+    _FIELDS = ("id", "status", "created", "started", "finished", "slides_done", "slides_total",
+               "key", "error", "owner")
+
+    def __init__(self, path=JOB_DB):
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, status TEXT, created REAL, started REAL, finished REAL,"
+            "slides_done INTEGER, slides_total INTEGER, key TEXT, error TEXT, result BLOB, owner TEXT)"
+        )
+        if "owner" not in {row[1] for row in self._db.execute("PRAGMA table_info(jobs)")}:
+            try:
+                self._db.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+            except sqlite3.OperationalError:  # another process just added it
+                pass
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_touched ON jobs (coalesce(finished, created))")
+        self._lock = threading.Lock()
+
+        self.owner = uuid.uuid4().hex
+        self._lease_dir = f"{path}.owners"
+        self._lease = None
+        if fcntl is not None:
+            os.makedirs(self._lease_dir, exist_ok=True)
+            self._lease = _take_lease(os.path.join(self._lease_dir, self.owner))
+            self.fail_orphans()
+
+    def fail_orphans(self, owners=None):
+        """Mark failed the unfinished jobs of `owners` (default: all known) whose process has exited."""
+        if self._lease is None:
+            return
+        if owners is None:
+            rows = self._execute("SELECT DISTINCT owner FROM jobs WHERE status IN (?, ?) AND owner IS NOT NULL",
+                                 (QUEUED, RUNNING))
+            owners = {owner for owner, in rows} | set(os.listdir(self._lease_dir))
+        for owner in owners:
+            if owner == self.owner or owner.endswith(".tmp"):
+                continue
+            path = os.path.join(self._lease_dir, owner)
+            if _lease_held(path):
+                continue
+            self._execute(
+                "UPDATE jobs SET status = ?, finished = ?, error = ? WHERE owner = ? AND status IN (?, ?)",
+                (FAILED, time.time(), json.dumps(INTERRUPTED), owner, QUEUED, RUNNING),
+            )
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _execute(self, sql, args=()):
+        with self._lock:
+            return self._db.execute(sql, args).fetchall()
+
+    def put(self, job):
+        row = {**job, "error": json.dumps(job["error"]) if job["error"] is not None else None, "owner": self.owner}
+        self._execute(
+            f"INSERT INTO jobs ({', '.join(self._FIELDS)}) VALUES ({', '.join('?' * len(self._FIELDS))})",
+            [row[f] for f in self._FIELDS],
+        )
+
+    def _select(self, job_id):
+        rows = self._execute(f"SELECT {', '.join(self._FIELDS)} FROM jobs WHERE id = ?", (job_id,))
+        return dict(zip(self._FIELDS, rows[0])) if rows else None
+
+    def get(self, job_id):
+        job = self._select(job_id)
+        if job is not None and job["status"] in (QUEUED, RUNNING) and job["owner"] not in (self.owner, None):
+            self.fail_orphans([job["owner"]])  # run by another process, which may have exited
+            job = self._select(job_id)
+        if job is None:
+            return None
+        if job["error"] is not None:
+            job["error"] = json.loads(job["error"])
+        return job
+
+    def update(self, job_id, **fields):
+        if "error" in fields and fields["error"] is not None:
+            fields["error"] = json.dumps(fields["error"])
+        names = list(fields)
+        self._execute(
+            f"UPDATE jobs SET {', '.join(f'{name} = ?' for name in names)} WHERE id = ?",
+            [fields[name] for name in names] + [job_id],
+        )
+
+    def finish(self, job_id, result, **fields):
+        self.update(job_id, result=result, **fields)
+
+    def result(self, job_id):
+        rows = self._execute("SELECT result FROM jobs WHERE id = ?", (job_id,))
+        return rows[0][0] if rows and rows[0][0] is not None else None
+
+    def count_unfinished(self):
+        return self._execute("SELECT count(*) FROM jobs WHERE status IN (?, ?)", (QUEUED, RUNNING))[0][0]
+
+    def evict(self, before):
+        self.fail_orphans()
+        self._execute("DELETE FROM jobs WHERE coalesce(finished, created) < ?", (before,))
+
+
+def open_store(kind=JOB_STORE):
+    if kind == "memory":
+        return MemoryJobStore()
+    if kind == "sqlite":
+        return SqliteJobStore()
+    raise ValueError(f"Unknown job store {kind!r}")
+
+
+class JobQueue:
+    """Runs render jobs in the background, `concurrency` at a time.
+
+    `submit` records a queued job and returns it at once; the work itself is
+    an awaitable factory called with the job id once a slot frees up. Its
+    result (bytes) is kept in the store until `ttl` seconds after the job
+    finishes, which is also how long a job can be polled.
+    """
+
+    def __init__(self, store_kind=JOB_STORE, concurrency=JOB_CONCURRENCY, queue_limit=JOB_QUEUE_LIMIT,
+                 ttl=JOB_TTL, retry_delay=JOB_RETRY_DELAY):
+        self.store_kind = store_kind
+        self.concurrency = concurrency
+        self.queue_limit = queue_limit
+        self.ttl = ttl
+        self.retry_delay = retry_delay
+        self._store = None
+        self._semaphore = None
+        self._tasks = set()
+        self._last_eviction = 0.0
+
+    @property
+    def store(self):
+        # opened on first use, so render worker processes importing this never touch it
+        if self._store is None:
+            self._store = open_store(self.store_kind)
+        return self._store
+
+    def evict_expired(self):
+        now = time.time()
+        if now - self._last_eviction >= min(self.ttl, 60):
+            self._last_eviction = now
+            self.store.evict(now - self.ttl)
+
+    def get(self, job_id):
+        self.evict_expired()
+        return self.store.get(job_id)
+
+    def submit(self, run, key=None):
+        """Queue `run(job_id)` and return the new job, or raise 503 when the queue is full."""
+        self.evict_expired()
+        if self.store.count_unfinished() >= self.queue_limit:
+            raise HTTPException(
+                status_code=503,
+                detail="Too many jobs are waiting. Please retry shortly.",
+                headers={"Retry-After": "30"},
+            )
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+
+        job = {
+            "id": uuid.uuid4().hex, "status": QUEUED, "created": time.time(), "started": None,
+            "finished": None, "slides_done": 0, "slides_total": None, "key": key, "error": None,
+        }
+        self.store.put(job)
+        task = asyncio.get_running_loop().create_task(self._run(job["id"], run))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    async def _run(self, job_id, run):
+        async with self._semaphore:
+            self.store.update(job_id, status=RUNNING, started=time.time())
+            try:
+                while True:
+                    try:
+                        result = await run(job_id)
+                        break
+                    except HTTPException as e:
+                        if e.status_code != 503:  # the render pool is full; wait for a worker
+                            raise
+                        await asyncio.sleep(self.retry_delay)
+            except HTTPException as e:
+                error = {"status_code": e.status_code, "detail": e.detail}
+                count_error(e.status_code)
+                self.store.update(job_id, status=FAILED, finished=time.time(), error=error)
+            except Exception:
+                logger.exception("Job %s failed", job_id)
+                error = {"status_code": 500, "detail": "Rendering failed."}
+                count_error(500)
+                self.store.update(job_id, status=FAILED, finished=time.time(), error=error)
+            else:
+                self.store.finish(job_id, result, status=DONE, finished=time.time())
+
+
+job_queue = JobQueue()
+
+# Set in render worker processes: progress goes back to the API process through it
+_progress_queue = None
+
+
+def report_progress(job_id, slides_done, slides_total):
+    if _progress_queue is not None:
+        _progress_queue.put((job_id, slides_done, slides_total))
+    else:
+        job_queue.store.update(job_id, slides_done=slides_done, slides_total=slides_total)
+
+
+def job_progress(job_id):
+    """Progress callback for `generate_pptx` that records slide counts on the job."""
+    return partial(report_progress, job_id)
+
+
+def open_progress_channel(mp_context):
+    """Queue for worker processes to report progress on, drained into the store by a thread."""
+    channel = mp_context.SimpleQueue()
+
+    def drain():
+        for job_id, slides_done, slides_total in iter(channel.get, None):
+            job_queue.store.update(job_id, slides_done=slides_done, slides_total=slides_total)
+
+    threading.Thread(target=drain, name="job-progress", daemon=True).start()
+    return channel
+
+
+def init_progress_channel(channel):
+    """Render worker initializer half: report progress through `channel`."""
+    global _progress_queue
+    _progress_queue = channel
@@ -0,0 +1,250 @@
+import contextvars
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from phases import add_phase_listener
+
+
+# Collect request and render metrics and serve them on /metrics (Prometheus
+# text format); when off, every hook below returns after one check
+METRICS_ENABLED = os.getenv("PPTX_METRICS", "0") != "0"
+
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+ROWS_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+SLIDES_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500)
+BYTES_BUCKETS = (16_000, 64_000, 256_000, 1_000_000, 4_000_000, 16_000_000, 64_000_000)
+
+# Failed requests and jobs by status code; other 4xx are "client_error", 5xx "internal"
+ERROR_CAUSES = {400: "bad_request", 404: "not_found", 409: "not_ready", 422: "validation", 503: "busy"}
+
+_registry = {}
+# Set in render worker processes: observations go back to the API process through it
+_forward = None
+# True inside `muted()`
+_muted = contextvars.ContextVar("pptx_metrics_muted", default=False)
+
+
+def recording():
+    """Whether observations made here are kept: metrics are on, outside a `muted()` block."""
+    return METRICS_ENABLED and not _muted.get()
+
+
+@contextmanager
+def muted():
+    """Block whose observations are dropped, e.g. warm-up renders that are not traffic."""
+    token = _muted.set(True)
+    try:
+        yield
+    finally:
+        _muted.reset(token)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry[name] = self
+
+    def _submit(self, labels, value):
+        if _forward is not None:
+            _forward.put((self.name, labels, value))
+        else:
+            self._record(labels, value)
+
+    def _record(self, labels, value):
+        raise NotImplementedError
+
+    def samples(self):
+        """Exposition lines below the HELP/TYPE header."""
+        raise NotImplementedError
+
+    def exposition(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}", *self.samples()]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, value=1):
+        if recording():
+            self._submit(labels, value)
+
+    def _record(self, labels, value):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + value
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        if not values and not self.labelnames:  # exported from the start, as 0
+            values = [((), 0)]
+        return [f"{self.name}{_labels(self.labelnames, labels)} {value}" for labels, value in values]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, buckets, labelnames=()):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        if recording():
+            self._submit(labels, value)
+
+    def _record(self, labels, value):
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                # per-bucket counts (the last one is +Inf), sum
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0]
+            state[0][bisect_left(self.buckets, value)] += 1
+            state[1] += value
+
+    def samples(self):
+        with self._lock:
+            values = sorted((labels, (list(counts), total)) for labels, (counts, total) in self._values.items())
+        lines = []
+        for labels, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == "+Inf" else f'le="{float(bound)!r}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {float(total)!r}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class Collected(_Metric):
+    """Gauge or counter read at scrape time: `fn()` returns {label values: value}."""
+
+    def __init__(self, name, help, kind, fn, labelnames=()):
+        super().__init__(name, help, labelnames)
+        self.kind = kind
+        self.fn = fn
+
+    def samples(self):
+        return [f"{self.name}{_labels(self.labelnames, labels)} {value}" for labels, value in sorted(self.fn().items())]
+
+
+http_requests = Counter("pptx_http_requests_total", "HTTP requests by route and status.",
+                        ("method", "route", "status"))
+http_seconds = Histogram("pptx_http_request_duration_seconds",
+                         "Time from request to last response byte, by route.", SECONDS_BUCKETS, ("method", "route"))
+errors = Counter("pptx_errors_total", "Failed requests and background jobs by cause.", ("cause",))
+validation_failures = Counter("pptx_validation_failures_total", "Requests (or batch decks) rejected by validation.")
+validation_violations = Counter("pptx_validation_violations_total", "Validation problems found, by type.", ("type",))
+phase_seconds = Histogram("pptx_phase_duration_seconds",
+                          "Time per render phase block; table and circles are timed per slide.",
+                          SECONDS_BUCKETS, ("phase",))
+deck_rows = Histogram("pptx_deck_rows", "Table rows per rendered deck.", ROWS_BUCKETS)
+deck_slides = Histogram("pptx_deck_slides", "Slides per rendered deck.", SLIDES_BUCKETS)
+deck_size = Histogram("pptx_deck_bytes", "Size of each saved deck.", BYTES_BUCKETS)
+status_cells = Counter("pptx_status_cells_total", "Status cells of rendered decks, by circle color.", ("color",))
+status_fallbacks = Counter("pptx_status_fallbacks_total",
+                           "Status cells that matched no alias and got the default color.")
+
+
+def collect(name, help, kind, fn, labelnames=()):
+    """Export `fn()` ({label values: value}) as a gauge or counter read on every scrape."""
+    return Collected(name, help, kind, fn, labelnames)
+
+
+def error_cause(status_code):
+    return ERROR_CAUSES.get(status_code, "internal" if status_code >= 500 else "client_error")
+
+
+def count_error(status_code):
+    if METRICS_ENABLED and status_code >= 400:
+        errors.inc(error_cause(status_code))
+
+
+def count_validation_failure(violations):
+    """Record one rejected request with its `find_violations` errors."""
+    if METRICS_ENABLED:
+        validation_failures.inc()
+        for violation in violations:
+            validation_violations.inc(violation["type"])
+
+
+def exposition():
+    """Every metric in the Prometheus text format."""
+    lines = []
+    for metric in list(_registry.values()):
+        lines.extend(metric.exposition())
+    return "\n".join(lines) + "\n"
+
+
+def _observe_phase(name, start, end, attributes):
+    phase_seconds.observe(end - start, name)
+
+
+if METRICS_ENABLED:
+    add_phase_listener(_observe_phase)
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing each HTTP request to its last body byte (streamed decks included)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_and_watch(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_and_watch)
+        finally:
+            # the route template, not the path, so job ids don't become labels
+            route = scope.get("route")
+            route = route.path if route is not None else "unmatched"
+            http_seconds.observe(time.perf_counter() - start, scope["method"], route)
+            http_requests.inc(scope["method"], route, str(status))
+            count_error(status)
+
+
+def open_metrics_channel(mp_context):
+    """Queue for worker processes to send observations on, recorded here by a thread."""
+    channel = mp_context.SimpleQueue()
+
+    def drain():
+        for name, labels, value in iter(channel.get, None):
+            _registry[name]._record(labels, value)
+
+    threading.Thread(target=drain, name="metrics", daemon=True).start()
+    return channel
+
+
+def init_metrics_channel(channel):
+    """Render worker initializer half: send observations through `channel`."""
+    global _forward
+    _forward = channel
@@ -0,0 +1,138 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+
+
+OUTPUT_CACHE_BYTES = int(os.getenv("PPTX_OUTPUT_CACHE_BYTES", str(64 * 1024 * 1024)))
+# Optional second tier on disk, e.g. a volume shared by all workers of a node
+OUTPUT_CACHE_DIR = os.getenv("PPTX_OUTPUT_CACHE_DIR") or None
+OUTPUT_CACHE_DISK_BYTES = int(os.getenv("PPTX_OUTPUT_CACHE_DISK_BYTES", str(1024 * 1024 * 1024)))
+
+# Bump when a code change alters the deck rendered for the same request and
+# settings, so decks cached (in memory or on disk) before it are not served
+OUTPUT_VERSION = 2
+
+# What every key (and so every ETag) looks like: a hex SHA-256
+_KEY = re.compile(r"[0-9a-f]{64}")
+
+
+def render_digest(template_digest, *settings):
+    """Hash of what besides the request shapes a deck: template, render settings and OUTPUT_VERSION."""
+    return hashlib.sha256(json.dumps([OUTPUT_VERSION, template_digest, *settings]).encode()).hexdigest()[:32]
+
+
+def request_key(payload, render_digest):
+    """Stable content hash of a request payload plus the `render_digest` it renders with."""
+    h = hashlib.sha256(render_digest.encode())
+    h.update(json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode())
+    return h.hexdigest()
+
+
+def upload_key(upload: bytes, render_digest):
+    """Content hash of an uploaded workbook plus the `render_digest` it renders with."""
+    h = hashlib.sha256(render_digest.encode())
+    h.update(b"xlsx:")
+    h.update(upload)
+    return h.hexdigest()
+
+
+def previous_key(key, previous: bytes):
+    """Key for the deck of request `key` built reusing slides of the client-sent deck `previous`."""
+    h = hashlib.sha256(key.encode())
+    h.update(b"previous:")
+    h.update(previous)
+    return h.hexdigest()
+
+
+def is_key(value):
+    """Whether `value` is shaped like a cache key, so it is safe to look up (and use in a path)."""
+    return _KEY.fullmatch(value) is not None
+
+
+class OutputCache:
+    """Size-bounded LRU of rendered decks, with an optional on-disk tier."""
+
+    def __init__(self, max_bytes=OUTPUT_CACHE_BYTES, disk_dir=OUTPUT_CACHE_DIR, max_disk_bytes=OUTPUT_CACHE_DISK_BYTES):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def get(self, key):
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                return data
+
+        data = self._disk_get(key)
+        if data is not None:
+            self._memory_put(key, data)
+        return data
+
+    def put(self, key, data):
+        self._memory_put(key, data)
+        self._disk_put(key, data)
+
+    def _memory_put(self, key, data):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+            self._entries[key] = data
+            self._size += len(data)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def _disk_path(self, key):
+        if not is_key(key):
+            raise ValueError(f"Not a cache key: {key!r}")
+        return os.path.join(self.disk_dir, f"{key}.pptx")
+
+    def _disk_get(self, key):
+        if not self.disk_dir:
+            return None
+        try:
+            with open(self._disk_path(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _disk_put(self, key, data):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        self._disk_evict()
+
+    def _disk_evict(self):
+        files = []
+        for entry in os.scandir(self.disk_dir):
+            if entry.name.endswith(".pptx"):
+                st = entry.stat()
+                files.append((st.st_mtime, st.st_size, entry.path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+output_cache = OutputCache()
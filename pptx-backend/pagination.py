@@ -0,0 +1,23 @@
+def plan_pages(row_heights, available_height, header_height, max_rows=0, repeat_header=True):
+    """Split rows into consecutive (start, end) slices, one per slide.
+
+    Rows are packed in order, each slide taking as many as fit in
+    `available_height` under its header (only the first slide has one
+    unless `repeat_header`), and at most `max_rows` when that is set.
+    Filling every slide before starting the next gives the fewest slides
+    for an order-preserving split. A row taller than a whole slide gets a
+    slide to itself.
+    """
+    pages = []
+    start = 0
+    used = header_height
+    for i, height in enumerate(row_heights):
+        full = max_rows and i - start >= max_rows
+        if i > start and (full or used + height > available_height):
+            pages.append((start, i))
+            start = i
+            used = header_height if repeat_header else 0
+        used += height
+    if start < len(row_heights):
+        pages.append((start, len(row_heights)))
+    return pages
@@ -0,0 +1,34 @@
+import time
+from contextlib import contextmanager
+
+
+_listeners = []
+
+
+def add_phase_listener(fn):
+    """Call `fn(name, start, end, attributes)` (perf_counter seconds) whenever a `phase` block ends."""
+    _listeners.append(fn)
+
+
+def remove_phase_listener(fn):
+    _listeners.remove(fn)
+
+
+@contextmanager
+def phase(name, **attributes):
+    """Mark a stage of the render pipeline (template load, table fill, save...).
+
+    Yields the `attributes` dict (slide index, row count...), which the block
+    may add to. Costs one check when nobody is listening; benchmarks, metrics
+    and tracing listen.
+    """
+    if not _listeners:
+        yield attributes
+        return
+    start = time.perf_counter()
+    try:
+        yield attributes
+    finally:
+        end = time.perf_counter()
+        for fn in tuple(_listeners):
+            fn(name, start, end, attributes)
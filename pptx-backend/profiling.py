@@ -0,0 +1,106 @@
+import cProfile
+import hmac
+import io
+import itertools
+import os
+import pstats
+import random
+import re
+import tracemalloc
+import uuid
+
+
+# Requests sending this token in X-Profile are rendered under cProfile; unset = off
+PROFILE_TOKEN = os.getenv("PPTX_PROFILE_TOKEN") or None
+# Fraction (0-1) of rendered (cache-missing) requests profiled without asking
+PROFILE_SAMPLE_RATE = float(os.getenv("PPTX_PROFILE_SAMPLE_RATE", "0"))
+PROFILE_DIR = os.getenv("PPTX_PROFILE_DIR", "profiles")
+# Profiles kept in PROFILE_DIR; the oldest are deleted as new ones start
+PROFILE_KEEP = int(os.getenv("PPTX_PROFILE_KEEP", "100"))
+# Functions / allocation sites listed in the text summaries
+PROFILE_TOP = int(os.getenv("PPTX_PROFILE_TOP", "40"))
+
+
+def _prune_profiles():
+    """Delete all but the newest PROFILE_KEEP profiles, with their summaries."""
+    entries = [entry for entry in os.scandir(PROFILE_DIR) if entry.name.endswith(".prof")]
+    if len(entries) <= PROFILE_KEEP:
+        return
+    entries.sort(key=lambda entry: entry.stat().st_mtime)
+    for entry in entries[:len(entries) - PROFILE_KEEP]:
+        base = entry.path[:-len(".prof")]
+        for path in (entry.path, base + ".txt", base + ".memory.txt"):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def _profile_id(request_id):
+    """`request_id` made safe for a file name (else a fresh id), with -2, -3... if taken.
+
+    The name is reserved by creating its .prof file, so concurrent requests
+    with one X-Request-ID never write over each other.
+    """
+    name = re.sub(r"[^A-Za-z0-9._-]+", "-", request_id or "").strip(".-")[:64] or uuid.uuid4().hex
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    for n in itertools.count(1):
+        profile_id = name if n == 1 else f"{name}-{n}"
+        try:
+            os.close(os.open(os.path.join(PROFILE_DIR, f"{profile_id}.prof"), os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            break
+        except FileExistsError:
+            pass
+    _prune_profiles()
+    return profile_id
+
+
+def requested_profile(token, memory=False, request_id=None):
+    """(profile id, trace memory) when `token` unlocks profiling, else None."""
+    if PROFILE_TOKEN is None or not token or not hmac.compare_digest(token.encode(), PROFILE_TOKEN.encode()):
+        return None
+    return (_profile_id(request_id), bool(memory))
+
+
+def sampled_profile(request_id=None):
+    """A profile for this request if it falls in the sampled fraction."""
+    if PROFILE_SAMPLE_RATE <= 0 or random.random() >= PROFILE_SAMPLE_RATE:
+        return None
+    return (_profile_id(request_id), False)
+
+
+def profile_path(profile):
+    """Where the cProfile stats of `profile` are written (summaries sit beside it)."""
+    return os.path.abspath(os.path.join(PROFILE_DIR, f"{profile[0]}.prof"))
+
+
+def run_profiled(profile, fn, *args):
+    """`fn(*args)` under cProfile, and tracemalloc when `profile` asks for it.
+
+    Writes <id>.prof (load with pstats or snakeviz), <id>.txt (top functions
+    by cumulative time) and, with memory tracing, <id>.memory.txt (peak and
+    top allocation sites). cProfile sees only the calling thread, so run this
+    on the render worker; tracemalloc traces the whole process.
+    """
+    path = profile_path(profile)
+    memory = profile[1] and not tracemalloc.is_tracing()
+    if memory:
+        tracemalloc.start()
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(fn, *args)
+    finally:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if memory:
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            with open(path[:-len(".prof")] + ".memory.txt", "w") as f:
+                f.write(f"peak traced: {peak / 1024:.0f} KiB\n\n")
+                for stat in snapshot.statistics("lineno")[:PROFILE_TOP]:
+                    f.write(f"{stat}\n")
+        profiler.dump_stats(path)
+        summary = io.StringIO()
+        pstats.Stats(profiler, stream=summary).sort_stats("cumulative").print_stats(PROFILE_TOP)
+        with open(path[:-len(".prof")] + ".txt", "w") as f:
+            f.write(summary.getvalue())
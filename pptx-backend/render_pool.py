@@ -0,0 +1,137 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import get_context
+
+from fastapi import HTTPException
+
+from tracing import capture, resumed_span
+
+
+# "thread" shares the GIL with the API process; "process" scales across cores
+RENDER_BACKEND = os.getenv("PPTX_RENDER_BACKEND", "thread")
+RENDER_WORKERS = int(os.getenv("PPTX_RENDER_WORKERS", "4"))
+# Renders allowed to wait for a free worker before new ones are turned away with 503
+RENDER_QUEUE_LIMIT = int(os.getenv("PPTX_RENDER_QUEUE_LIMIT", "8"))
+# Recycle a worker process after this many renders (0 = never), bounds lxml heap growth
+RENDER_MAX_TASKS_PER_CHILD = int(os.getenv("PPTX_RENDER_MAX_TASKS_PER_CHILD", "0"))
+
+
+class RenderError(Exception):
+    """Picklable stand-in for an HTTPException raised inside a worker process."""
+
+    def __init__(self, status_code, detail):
+        super().__init__(status_code, detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def _call_in_worker(fn, args, trace=None):
+    try:
+        with resumed_span(trace, "render", function=getattr(fn, "__name__", "render")):
+            return fn(*args)
+    except HTTPException as e:
+        raise RenderError(e.status_code, e.detail) from None
+
+
+class RenderPool:
+    """Bounded pool that runs CPU-heavy deck rendering off the event loop.
+
+    With the process backend, `fn` and its arguments are pickled, so tasks must
+    be module-level functions taking compact, plain-data arguments.
+    """
+
+    def __init__(self, backend=RENDER_BACKEND, workers=RENDER_WORKERS, queue_limit=RENDER_QUEUE_LIMIT,
+                 max_tasks_per_child=RENDER_MAX_TASKS_PER_CHILD, initializer=None, initargs=()):
+        if backend not in ("thread", "process"):
+            raise ValueError(f"Unknown render backend {backend!r}")
+        self.backend = backend
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.max_tasks_per_child = max_tasks_per_child or None
+        self.initializer = initializer
+        self.initargs = initargs
+        self._executor = None
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    @property
+    def mp_context(self):
+        return get_context("spawn")
+
+    @property
+    def in_flight(self):
+        return self._in_flight
+
+    def start(self):
+        if self._executor is not None:
+            return
+        if self.backend == "process":
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=self.mp_context,
+                initializer=self.initializer,
+                initargs=self.initargs,
+                max_tasks_per_child=self.max_tasks_per_child,
+            )
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="render")
+
+    def warm_up(self, fn, *args):
+        """Start every worker and run `fn` once on each, without waiting for the result."""
+        self.start()
+        return [self._executor.submit(_call_in_worker, fn, args) for _ in range(self.workers)]
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _release(self, _future):
+        with self._lock:
+            self._in_flight -= 1
+
+    def submit(self, fn, *args):
+        """Queue `fn(*args)` and return its concurrent future, or raise 503 when saturated."""
+        self.start()
+        with self._lock:
+            if self._in_flight >= self.workers + self.queue_limit:
+                raise HTTPException(
+                    status_code=503,
+                    detail="Server is busy generating other decks. Please retry shortly.",
+                    headers={"Retry-After": "5"},
+                )
+            self._in_flight += 1
+        try:
+            # the work joins the trace of the request queuing it, in any thread or process
+            future = self._executor.submit(_call_in_worker, fn, args, capture())
+        except BaseException:
+            self._release(None)
+            raise
+        # released when the work really finishes, even if the client went away
+        future.add_done_callback(self._release)
+        return future
+
+    async def stream(self, fn, *args):
+        """Run `fn(emit, *args)` on the pool, yielding each chunk it passes to `emit` as it comes.
+
+        Thread backend only: the chunks are handed over in process.
+        """
+        loop = asyncio.get_running_loop()
+        chunks = asyncio.Queue()
+        future = asyncio.wrap_future(self.submit(fn, lambda chunk: loop.call_soon_threadsafe(chunks.put_nowait, chunk), *args))
+        # scheduled after every chunk emitted before fn returned
+        future.add_done_callback(lambda _: chunks.put_nowait(None))
+        while (chunk := await chunks.get()) is not None:
+            yield chunk
+        try:
+            future.result()
+        except RenderError as e:
+            raise HTTPException(status_code=e.status_code, detail=e.detail) from None
+
+    async def run(self, fn, *args):
+        try:
+            return await asyncio.wrap_future(self.submit(fn, *args))
+        except RenderError as e:
+            raise HTTPException(status_code=e.status_code, detail=e.detail) from None
@@ -0,0 +1,104 @@
+from lxml import etree
+from pptx.opc.constants import CONTENT_TYPE as CT
+from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+from pptx.oxml import parse_xml
+from pptx.parts.slide import SlidePart
+
+
+_R_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+
+
+def _rId_order(rel):
+    # rIdN by number; other ids (templates from other tools may use any name)
+    # after them, in the part's own order (the sort is stable)
+    suffix = rel.rId[3:]
+    return (0, int(suffix)) if rel.rId.startswith("rId") and suffix.isdecimal() else (1, 0)
+
+
+def _slide_template(slide):
+    """(slide XML, relationships) to stamp copies of `slide` from.
+
+    The notes relationship is left out (a notes slide belongs to exactly one
+    slide). The others are renumbered rId1.. in order, matching the rIds a
+    fresh part hands out, and the XML's r:* references are rewritten to suit,
+    so every copy can relate to the same target parts without touching the XML.
+    """
+    element = parse_xml(etree.tostring(slide._element))
+    rels = []
+    rId_map = {}
+    seen = {}
+    for rel in sorted(slide.part.rels.values(), key=_rId_order):
+        if rel.reltype == RT.NOTES_SLIDE:
+            continue
+        target = rel.target_ref if rel.is_external else rel.target_part
+        key = (rel.reltype, rel.is_external, target if rel.is_external else id(target))
+        if key not in seen:  # relate_to reuses an identical relationship
+            seen[key] = "rId%d" % (len(seen) + 1)
+            rels.append((rel.reltype, target, rel.is_external))
+        rId_map[rel.rId] = seen[key]
+
+    for el in element.iter():
+        for name, value in el.attrib.items():
+            if name.startswith(_R_NS) and value in rId_map:
+                el.set(name, rId_map[value])
+    return etree.tostring(element), rels
+
+
+class _StoredSlidePart(SlidePart):
+    """Slide part saved as the exact bytes it was created from."""
+
+    def __init__(self, partname, content_type, package, blob):
+        super().__init__(partname, content_type, package, parse_xml(blob))
+        self._stored_blob = blob
+
+    @property
+    def blob(self):
+        return self._stored_blob
+
+
+def freeze_slide(slide):
+    """Serialize `slide` now and save it as those bytes from then on; returns them.
+
+    For a finished slide whose XML is needed before the deck is saved (to
+    hash it, say), so it is not serialized a second time when it is.
+    """
+    part = slide.part
+    if not isinstance(part, _StoredSlidePart):
+        blob = part.blob
+        part.__class__ = _StoredSlidePart
+        part._stored_blob = blob
+    return part.blob
+
+
+def clone_slides(prs, slide, count, stored=None):
+    """Append `count` copies of `slide` to `prs` and return them.
+
+    The slide is serialized once and each copy is parsed from that, instead of
+    going through `add_slide` (which clones the layout placeholders only for us
+    to delete them) and deep-copying shape by shape. Copies reference the same
+    layout, images and other parts as `slide`; notes text is copied over.
+
+    `stored` maps copy indexes to slide XML saved earlier from a copy of the
+    same slide; those copies take that XML and are saved as those exact bytes,
+    so they must not be edited.
+    """
+    slide_xml, rels = _slide_template(slide)
+    notes = slide.notes_slide.notes_text_frame.text if slide.has_notes_slide else ""
+    prs_part = prs.part
+    sldIdLst = prs.slides._sldIdLst
+
+    copies = []
+    for i in range(count):
+        partname = prs_part._next_slide_partname
+        if stored and i in stored:
+            slide_part = _StoredSlidePart(partname, CT.PML_SLIDE, prs_part.package, stored[i])
+        else:
+            slide_part = SlidePart(partname, CT.PML_SLIDE, prs_part.package, parse_xml(slide_xml))
+        for reltype, target, is_external in rels:
+            slide_part.relate_to(target, reltype, is_external=is_external)
+        sldIdLst.add_sldId(prs_part.relate_to(slide_part, RT.SLIDE))
+        new_slide = slide_part.slide
+        if notes:
+            new_slide.notes_slide.notes_text_frame.text = notes
+        copies.append(new_slide)
+    return copies
@@ -0,0 +1,118 @@
+import hashlib
+import json
+import os
+import re
+from collections import Counter
+
+from pptx.dml.color import RGBColor
+
+from metrics import recording, status_cells, status_fallbacks
+
+
+# Optional JSON file overriding the defaults below:
+# {"colors": {"green": "00B050", ...}, "aliases": {"action over": "green", ...}, "default": "yellow"}
+STATUS_CONFIG = os.getenv("PPTX_STATUS_CONFIG")
+
+DEFAULT_COLORS = {
+    "green": "00B050",
+    "blue": "0070C0",
+    "red": "C00000",
+    "yellow": "FFC000",
+}
+
+# Checked in order: a status containing an earlier alias wins over a later one
+DEFAULT_ALIASES = {
+    # Exact dropdown values
+    "action over": "green",
+    "over": "green",
+    "completed": "green",
+
+    "in progress": "blue",
+    "progress": "blue",
+
+    "not as per plan": "red",
+    "delayed": "red",
+
+    "yet to start": "yellow",
+    "pending": "yellow",
+    "to do": "yellow",
+    "todo": "yellow",
+}
+
+DEFAULT_STATUS = "yellow"
+
+
+class StatusClassifier:
+    """Maps free-text status cells to a circle color.
+
+    A status equal to an alias (case-insensitive, trimmed) is a dict lookup.
+    Otherwise one precompiled regex finds the first alias, in priority order,
+    that occurs anywhere in it; no match falls back to `default`.
+    `count` records a deck's status cells in the pptx_status_* metrics.
+    """
+
+    def __init__(self, aliases=None, colors=None, default=DEFAULT_STATUS):
+        aliases = {k.strip().lower(): v for k, v in (aliases or DEFAULT_ALIASES).items()}
+        colors = colors or DEFAULT_COLORS
+        unknown = {v for v in aliases.values() if v not in colors} - {default}
+        if default not in colors or unknown:
+            raise ValueError(f"Status colors missing for: {sorted(unknown | ({default} - set(colors)))}")
+
+        self.default = default
+        # identifies the mapping, for keying output that depends on it
+        self.digest = hashlib.sha256(json.dumps([list(aliases.items()), colors, default]).encode()).hexdigest()[:16]
+        self.rgb_by_color = {name: RGBColor.from_string(hex_value) for name, hex_value in colors.items()}
+        self.exact = dict(aliases)
+        self._colors = list(aliases.values())
+        # ^(?:(?=.*alias1)|(?=.*alias2)|...) tries the alternatives left to right
+        # at position 0, so the first alias in priority order that matches wins
+        self._pattern = re.compile(
+            "^(?:" + "|".join(f"(?=.*?({re.escape(alias)}))" for alias in aliases) + ")",
+            re.DOTALL,
+        )
+
+    def _match(self, status_str):
+        """(color name, whether no alias matched) for `status_str`."""
+        s = str(status_str).strip().lower() if status_str else ""
+        color = self.exact.get(s)
+        if color is not None:
+            return color, False
+        m = self._pattern.match(s) if s else None
+        if m:
+            return self._colors[m.lastindex - 1], False
+        return self.default, True
+
+    def classify(self, status_str):
+        """Color name for `status_str`."""
+        return self._match(status_str)[0]
+
+    def rgb(self, status_str):
+        """Circle fill for `status_str`."""
+        return self.rgb_by_color[self.classify(status_str)]
+
+    def count(self, statuses):
+        """Record one deck's status cells by color, sent as one update per color."""
+        if not recording():
+            return
+        colors = Counter()
+        fallbacks = 0
+        for status in statuses:
+            color, fallback = self._match(status)
+            colors[color] += 1
+            fallbacks += fallback
+        for color, n in colors.items():
+            status_cells.inc(color, value=n)
+        if fallbacks:
+            status_fallbacks.inc(value=fallbacks)
+
+
+def load_classifier(path=STATUS_CONFIG):
+    """Classifier from the JSON config at `path`, or the built-in tables."""
+    if not path:
+        return StatusClassifier()
+    with open(path) as f:
+        config = json.load(f)
+    return StatusClassifier(config.get("aliases"), config.get("colors"), config.get("default", DEFAULT_STATUS))
+
+
+status_classifier = load_classifier()
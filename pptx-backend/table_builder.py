@@ -0,0 +1,136 @@
+import re
+from xml.sax.saxutils import escape
+
+from pptx.oxml import parse_xml
+from pptx.oxml.ns import nsdecls
+
+from borders import ALL_SIDES, HEADER_SIDES
+
+
+_CTRL_CHARS = re.compile(r"([\x00-\x08\x0B-\x1F])")
+_LINE_BREAKS = re.compile("\n|\v")
+
+
+def escape_ctrl_chars(text):
+    """Escape control characters the same way python-pptx does when setting run text."""
+    return _CTRL_CHARS.sub(lambda m: "_x%04X_" % ord(m.group(1)), text)
+
+
+def cell_text(text):
+    """Text that `cell.text` reads back after `cell.text = text` (used for row-height estimates)."""
+    return "\n".join(
+        "\v".join(escape_ctrl_chars(r_str) for r_str in _LINE_BREAKS.split(p_text))
+        for p_text in text.split("\n")
+    )
+
+
+def grid_widths(num_cols, width, col_widths):
+    """Column widths as `add_table` + the `col_widths` overrides would leave them."""
+    base = width // num_cols
+    widths = [base] * (num_cols - 1) + [width - (num_cols - 1) * base]
+    widths[:len(col_widths)] = col_widths[:num_cols]
+    return [int(w) for w in widths]
+
+
+def _line_xml(side, hex_color, width_emu):
+    return (
+        f'<a:{side} w="{width_emu}" cap="flat" cmpd="sng" algn="ctr">'
+        f'<a:solidFill><a:srgbClr val="{hex_color}"/></a:solidFill>'
+        f'<a:prstDash val="solid"/>'
+        f'</a:{side}>'
+    )
+
+
+def _paragraphs_xml(text, algn, rPr):
+    """`a:p` elements for `text`, mirroring `TextFrame.text` assignment.
+
+    Only the first paragraph gets the alignment and only its first run gets
+    `rPr`, which is what the proxy renderer ends up producing.
+    """
+    parts = []
+    for p_idx, p_text in enumerate(text.split("\n")):
+        p = ["<a:p>"]
+        if p_idx == 0:
+            p.append(f'<a:pPr algn="{algn}"/>')
+        first_run = p_idx == 0
+        for r_idx, r_str in enumerate(_LINE_BREAKS.split(p_text)):
+            if r_idx > 0:
+                p.append("<a:br/>")
+            if r_str:
+                run_props = rPr if first_run else ""
+                first_run = False
+                p.append(f"<a:r>{run_props}<a:t>{escape(escape_ctrl_chars(r_str))}</a:t></a:r>")
+        p.append("</a:p>")
+        parts.append("".join(p))
+    return "".join(parts)
+
+
+def _cell_xml(text, algn, rPr, body_pr, fill_hex, borders_xml):
+    return (
+        f"<a:tc><a:txBody>{body_pr}<a:lstStyle/>"
+        f"{_paragraphs_xml(text, algn, rPr)}"
+        f'</a:txBody><a:tcPr anchor="ctr">'
+        f'<a:solidFill><a:srgbClr val="{fill_hex}"/></a:solidFill>'
+        f"{borders_xml}</a:tcPr></a:tc>"
+    )
+
+
+def build_table_xml(shape_id, columns, chunk, left, top, widths, header_height, row_heights,
+                    status_idx, aligns, header=True, header_fill="1E497F", border_rgb=(0, 0, 0),
+                    border_width_emu="19050"):
+    """Return the complete `p:graphicFrame` XML for one slide's table in a single pass.
+
+    With `header=False` the table starts straight with the `chunk` rows
+    (continuation slides when the header isn't repeated).
+    """
+    r, g, b = border_rgb
+    border_hex = f"{r:02X}{g:02X}{b:02X}"
+    header_borders = "".join(_line_xml(side, border_hex, border_width_emu) for side in HEADER_SIDES)
+    body_borders = "".join(_line_xml(side, border_hex, border_width_emu) for side in ALL_SIDES)
+    header_rPr = '<a:rPr sz="1400" b="1"><a:solidFill><a:srgbClr val="FFFFFF"/></a:solidFill></a:rPr>'
+    body_rPr = '<a:rPr sz="1200"/>'
+    header_height = header_height if header else 0
+    first_row = ' firstRow="1"' if header else ""
+
+    xml = [
+        f'<p:graphicFrame {nsdecls("a", "p")}>'
+        f'<p:nvGraphicFramePr><p:cNvPr id="{shape_id}" name="Table {shape_id - 1}"/>'
+        f'<p:cNvGraphicFramePr><a:graphicFrameLocks noGrp="1"/></p:cNvGraphicFramePr><p:nvPr/>'
+        f'</p:nvGraphicFramePr>'
+        f'<p:xfrm><a:off x="{int(left)}" y="{int(top)}"/>'
+        f'<a:ext cx="{sum(widths)}" cy="{header_height + sum(row_heights)}"/></p:xfrm>'
+        f'<a:graphic><a:graphicData uri="http://schemas.openxmlformats.org/drawingml/2006/table">'
+        f'<a:tbl><a:tblPr{first_row} bandRow="1"/><a:tblGrid>'
+    ]
+    xml.extend(f'<a:gridCol w="{w}"/>' for w in widths)
+    xml.append("</a:tblGrid>")
+    if header:
+        xml.append(f'<a:tr h="{header_height}">')
+        for head in columns:
+            xml.append(_cell_xml(head, "ctr", header_rPr, "<a:bodyPr/>", header_fill, header_borders))
+        xml.append("</a:tr>")
+
+    for row_data, height in zip(chunk, row_heights):
+        xml.append(f'<a:tr h="{height}">')
+        for c, text in enumerate(row_data):
+            text = "" if c == status_idx else text
+            xml.append(_cell_xml(text, aligns[c].xml_value, body_rPr, '<a:bodyPr wrap="square"/>', "FFFFFF", body_borders))
+        # short rows keep add_table's untouched cells (borders only)
+        for _ in range(len(row_data), len(columns)):
+            xml.append(f"<a:tc><a:txBody><a:bodyPr/><a:lstStyle/><a:p/></a:txBody><a:tcPr>{body_borders}</a:tcPr></a:tc>")
+        xml.append("</a:tr>")
+
+    xml.append("</a:tbl></a:graphicData></a:graphic></p:graphicFrame>")
+    return "".join(xml)
+
+
+def add_table_fast(slide, columns, chunk, left, top, widths, header_height, row_heights, status_idx, aligns,
+                   header=True):
+    """Emit the table XML for `chunk`, insert it into the slide's spTree and return its |Table|."""
+    shapes = slide.shapes
+    graphicFrame = parse_xml(build_table_xml(
+        shapes._next_shape_id, columns, chunk, left, top, widths, header_height, row_heights, status_idx, aligns,
+        header=header,
+    ))
+    shapes._spTree.insert_element_before(graphicFrame, "p:extLst")
+    return shapes._shape_factory(graphicFrame).table
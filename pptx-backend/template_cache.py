@@ -0,0 +1,73 @@
+import hashlib
+import io
+import os
+import threading
+from copy import deepcopy
+
+from pptx import Presentation
+
+
+TEMPLATE_DIR = os.getenv("PPTX_TEMPLATE_DIR", "powerpoints")
+
+
+class TemplateCache:
+    """Keeps one pristine parsed copy of each .pptx template and hands out clones.
+
+    Parsing a template re-reads the zip and rebuilds the whole package graph;
+    deep-copying the already parsed package is roughly twice as fast and never
+    touches the disk. A template is re-parsed when its file mtime changes, so
+    templates can be swapped without restarting the server.
+    """
+
+    def __init__(self, template_dir=TEMPLATE_DIR):
+        self.template_dir = template_dir
+        self._entries = {}  # name -> (mtime_ns, Presentation)
+        self._digests = {}  # name -> (mtime_ns, sha256 of the file)
+        self._lock = threading.Lock()
+
+    def _path(self, name):
+        return os.path.join(self.template_dir, name)
+
+    def load_all(self):
+        """Parse every template in the template directory (called at startup)."""
+        for name in sorted(os.listdir(self.template_dir)):
+            if name.endswith(".pptx") and not name.startswith("~$"):
+                self._entry(name)
+
+    def _entry(self, name):
+        path = self._path(name)
+        mtime = os.stat(path).st_mtime_ns
+        entry = self._entries.get(name)
+        if entry is not None and entry[0] == mtime:
+            return entry
+
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None or entry[0] != mtime:
+                with open(path, "rb") as f:
+                    blob = f.read()
+                entry = (mtime, Presentation(io.BytesIO(blob)))
+                self._entries[name] = entry
+                self._digests[name] = (mtime, hashlib.sha256(blob).hexdigest())
+        return entry
+
+    def get(self, name):
+        """Return a private, mutable copy of the named template."""
+        return deepcopy(self._entry(name)[1])
+
+    def digest(self, name):
+        """sha256 of the template file currently in use, for keying rendered output.
+
+        Does not parse the template, so an API process that only dispatches to
+        render worker processes never pays for it.
+        """
+        mtime = os.stat(self._path(name)).st_mtime_ns
+        entry = self._digests.get(name)
+        if entry is None or entry[0] != mtime:
+            with open(self._path(name), "rb") as f:
+                entry = (mtime, hashlib.sha256(f.read()).hexdigest())
+            self._digests[name] = entry
+        return entry[1]
+
+
+template_cache = TemplateCache()
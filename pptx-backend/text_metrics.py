@@ -0,0 +1,320 @@
+import json
+import os
+import re
+from bisect import bisect_right
+from functools import lru_cache
+from itertools import accumulate
+
+
+METRICS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fonts")
+# Name of a table in fonts/ (or a path to one) built with fonts/build_metrics.py.
+# Helvetica is slightly wider than the templates' Calibri, so it errs towards
+# taller rows rather than text spilling out of a cell.
+TEXT_FONT_METRICS = os.getenv("PPTX_TEXT_FONT_METRICS", "helvetica")
+# Default left/right inset of a table cell (a:tcPr marL/marR, 0.1")
+CELL_MARGIN_EMU = 91440
+
+# Distinct words (and cells) whose measurements are memoized
+WORD_CACHE_SIZE = 65536
+# Cells with more words than this skip the vectorized wrap in max_lines_per_row
+# (every cell is padded to the longest one) and are measured one by one
+BATCH_MAX_WORDS = 256
+
+_HARD_BREAKS = re.compile("\n|\v")
+# PowerPoint may break a line after a hyphen as well as at spaces
+_SEGMENTS = re.compile(r"[^-]+-*|-+")
+
+
+class _AdvanceCache(dict):
+    """word -> width of the word plus one trailing space; misses are measured on lookup."""
+
+    def __init__(self, metrics):
+        super().__init__()
+        self.metrics = metrics
+
+    def __missing__(self, word):
+        if len(self) >= WORD_CACHE_SIZE:
+            self.clear()
+        advance = self[word] = self.metrics.text_width(word) + self.metrics.space_width
+        return advance
+
+
+class FontMetrics:
+    """Per-glyph advance widths of one font, with memoized word widths."""
+
+    def __init__(self, family, units_per_em, default_width, widths):
+        self.family = family
+        self.units_per_em = units_per_em
+        self.default_width = default_width
+        self.widths = widths  # codepoint -> advance in font units
+        self.space_width = widths.get(32, default_width)
+        self.max_width = max(max(widths.values(), default=0), default_width)
+        self.advances = _AdvanceCache(self)
+        self._glyph_table = None  # NumPy lookup array, built on the first batch call
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            data = json.load(f)
+        widths = {int(cp): w for cp, w in data["widths"].items()}
+        return cls(data["family"], data["units_per_em"], data["default_width"], widths)
+
+    def char_width(self, ch):
+        return self.widths.get(ord(ch), self.default_width)
+
+    def text_width(self, text):
+        widths = self.widths
+        default = self.default_width
+        return sum([widths.get(ord(ch), default) for ch in text])
+
+    def word_width(self, word):
+        return self.advances[word] - self.space_width
+
+    def available_units(self, width_emu, font_size_pt, margin_emu=CELL_MARGIN_EMU):
+        """Line width inside a cell of `width_emu`, in this font's units at `font_size_pt`."""
+        width_pt = max(width_emu - 2 * margin_emu, 12700) / 12700.0
+        return width_pt * self.units_per_em / font_size_pt
+
+
+@lru_cache(maxsize=None)
+def load_metrics(name=TEXT_FONT_METRICS):
+    path = name if name.endswith(".json") else os.path.join(METRICS_DIR, f"{name}.json")
+    return FontMetrics.load(path)
+
+
+@lru_cache(maxsize=WORD_CACHE_SIZE)
+def _split_hyphens(word):
+    return tuple(_SEGMENTS.findall(word))
+
+
+def _break_count(words, advances, available, metrics):
+    """Line count when every word fits on a line by itself: one bisect per line."""
+    # ends[k]: width of the first k words, each followed by a space
+    ends = list(accumulate(advances, initial=0))
+    limit = available + metrics.space_width  # the last word on a line needs no trailing space
+    count = 0
+    n = len(words)
+    i = 0
+    start = 0  # offset of the current line; inside words[i] after a hyphen break
+    while i < n:
+        line_start = start
+        i = bisect_right(ends, line_start + limit, i + 1) - 1
+        count += 1
+        start = ends[i]
+        if i < n and "-" in words[i]:
+            # the word that didn't fit may still leave its leading segments here
+            for part in _split_hyphens(words[i])[:-1]:
+                part_width = metrics.word_width(part)
+                if start + part_width > line_start + available:
+                    break
+                start += part_width
+    return count
+
+
+def _greedy_count(words, available, metrics):
+    """Word-by-word line count, for lines with a word wider than the cell."""
+    space = metrics.space_width
+    count = 1
+    current = -space  # so the first word on a line pays no leading space
+    for word in words:
+        w = metrics.word_width(word)
+        if current + space + w <= available:
+            current += space + w
+            continue
+        # doesn't fit: place it segment by segment, breaking after hyphens
+        gap = space
+        for part in _split_hyphens(word) if "-" in word else (word,):
+            pw = metrics.word_width(part)
+            if current + gap + pw <= available:
+                current += gap + pw
+                gap = 0
+                continue
+            gap = 0
+            if current > 0:
+                count += 1
+            if pw <= available:
+                current = pw
+                continue
+            # a segment wider than the cell is broken between characters
+            extra_lines, current = _char_break(part, available, metrics)
+            count += extra_lines
+    return count
+
+
+def _char_break(part, available, metrics):
+    """(extra lines, width of the last line) for a segment broken between characters."""
+    widths = metrics.widths
+    default = metrics.default_width
+    ends = list(accumulate([widths.get(ord(ch), default) for ch in part], initial=0))
+    n = len(part)
+    lines = 0
+    i = 0
+    while i < n:
+        start = i
+        i = max(bisect_right(ends, ends[i] + available, i + 1) - 1, i + 1)
+        lines += 1
+    return lines - 1, ends[n] - ends[start]
+
+
+def _wrap_count(line, available, metrics):
+    """Line count for one hard line, following PowerPoint's break rules."""
+    if len(line) * metrics.max_width <= available:  # fits even in the widest glyph
+        return 1
+    words = line.split()
+    if not words:
+        return 1
+    advances = list(map(metrics.advances.__getitem__, words))
+    limit = available + metrics.space_width
+    if sum(advances) <= limit:
+        return 1
+    if max(advances) <= limit:
+        return _break_count(words, advances, available, metrics)
+    return _greedy_count(words, available, metrics)
+
+
+@lru_cache(maxsize=WORD_CACHE_SIZE)
+def _cell_lines(text, width_emu, font_size_pt, metrics):
+    available = metrics.available_units(width_emu, font_size_pt)
+    if "\n" not in text and "\v" not in text:
+        return _wrap_count(text, available, metrics)
+    return sum(_wrap_count(line, available, metrics) for line in _HARD_BREAKS.split(text))
+
+
+def count_lines(text, width_emu, font_size_pt=12, metrics=None):
+    """Number of rendered lines `text` needs in a table cell `width_emu` wide."""
+    if not text:
+        return 1
+    return _cell_lines(text, width_emu, font_size_pt, metrics or load_metrics())
+
+
+def _glyph_table(metrics):
+    """Advance width per BMP code point for `metrics`; 0 marks a word separator."""
+    import numpy as np
+
+    if metrics._glyph_table is None:
+        table = np.full(0x10000, metrics.default_width, dtype=np.int64)
+        for cp, w in metrics.widths.items():
+            if cp < 0x10000:
+                table[cp] = max(w, 1)  # zero-width glyphs still belong to their word
+        # the same characters str.split() breaks on, plus NUL (text separator)
+        table[[cp for cp in range(0x10000) if chr(cp).isspace()]] = 0
+        table[0] = 0
+        metrics._glyph_table = table
+    return metrics._glyph_table
+
+
+def _measure_segments(texts, metrics):
+    """Measure the break units of all `texts` in one pass over their code points.
+
+    Units are words split after hyphens, as in `count_lines`. Returns
+    (widths, spaces, owners, hard_breaks): each unit's width, the space
+    that follows it (0 inside a hyphenated word), the index of its text,
+    and per text whether it contains \\n or \\v. Texts must not contain
+    NUL (cell_text escapes it).
+    """
+    import numpy as np
+
+    table = _glyph_table(metrics)
+    joined = "\0".join(texts)
+    if joined.isascii():
+        codes = np.frombuffer(joined.encode("ascii"), dtype=np.uint8)
+    else:
+        codes = np.frombuffer(joined.encode("utf-32-le"), dtype=np.uint32)
+        codes = np.minimum(codes, 0xFFFF)  # astral characters get the default width
+    char_widths = table[codes]
+
+    in_word = char_widths != 0
+    hyphen = codes == 45
+    # a unit starts after a blank, or after a hyphen that isn't followed by another one
+    starts = np.flatnonzero(in_word[1:] & (~in_word[:-1] | (hyphen[:-1] & ~hyphen[1:]))) + 1
+    if in_word[0]:
+        starts = np.concatenate(([0], starts))
+    if not len(starts):
+        return starts, starts, starts, np.zeros(len(texts), dtype=bool)
+    # separators are 0 wide, so each sum runs to the end of its unit
+    widths = np.add.reduceat(char_widths, starts)
+    word_ends = np.append(~in_word[starts[1:] - 1], True)
+    spaces = np.where(word_ends, metrics.space_width, 0)
+
+    separators = np.flatnonzero(codes == 0)
+    owners = np.searchsorted(separators, starts)
+    hard_breaks = np.zeros(len(texts), dtype=bool)
+    hard_breaks[np.searchsorted(separators, np.flatnonzero((codes == 10) | (codes == 11)))] = True
+    return widths, spaces, owners, hard_breaks
+
+
+def _wrap_batch(widths, spaces, available):
+    """Greedy line counts for rows of padded unit widths, all rows at once.
+
+    Rows must be sorted by unit count, longest first, so that the rows
+    still holding a unit at position j are always a prefix.
+    """
+    import numpy as np
+
+    active = (widths > 0).sum(axis=0)
+    lines = np.ones(len(widths), dtype=np.intp)
+    current = widths[:, 0] + spaces[:, 0]  # line width so far, incl. any trailing space
+    for j in range(1, widths.shape[1]):
+        k = active[j]
+        width = widths[:k, j]
+        line = current[:k]
+        wrapped = line + width > available
+        lines[:k] += wrapped
+        line[wrapped] = 0
+        line += width + spaces[:k, j]
+    return lines
+
+
+def max_lines_per_row(rows, widths, font_size_pt=12, skip_columns=(), metrics=None):
+    """Per-row max of `count_lines` over a whole table in one call.
+
+    Works a column at a time. Single-line cells that fit whatever their
+    glyphs are dropped up front; the rest are measured together (see
+    _measure_segments), padded into (cells x units) NumPy arrays and wrapped
+    greedily for all cells at once, one unit position at a time. Cells the
+    vectorized wrap doesn't cover (hard breaks, units wider than the cell,
+    more than BATCH_MAX_WORDS units) go through `count_lines`.
+    """
+    import numpy as np
+
+    metrics = metrics or load_metrics()
+    result = np.ones(len(rows), dtype=np.intp)
+    for c, width in enumerate(widths):
+        if c in skip_columns:
+            continue
+        available = metrics.available_units(width, font_size_pt)
+        column = [row[c] if c < len(row) else "" for row in rows]
+        lengths = np.fromiter(map(len, column), dtype=np.intp, count=len(column))
+        hard_break = np.fromiter(map(bool, map(_HARD_BREAKS.search, column)), dtype=bool, count=len(column))
+        candidates = np.flatnonzero((lengths * metrics.max_width > available) | hard_break)
+        if not candidates.size:
+            continue
+
+        texts = [column[r] for r in candidates.tolist()]
+        unit_widths, unit_spaces, owners, hard_breaks = _measure_segments(texts, metrics)
+        counts = np.bincount(owners, minlength=len(texts))
+        overlong = np.zeros(len(texts), dtype=bool)
+        overlong[owners[unit_widths > available]] = True
+        vectorized = ~hard_breaks & ~overlong & (counts > 0) & (counts <= BATCH_MAX_WORDS)
+
+        if vectorized.any():
+            keep = vectorized[owners]
+            order = np.argsort(-counts[vectorized], kind="stable")
+            sorted_counts = counts[vectorized][order]
+            # scatter each cell's units into its (sorted) row of the padded grids
+            rank = np.empty(len(order), dtype=np.intp)
+            rank[order] = np.arange(len(order))
+            cell_rows = np.repeat(rank, counts[vectorized])
+            cell_starts = np.concatenate(([0], np.cumsum(counts[vectorized])[:-1]))
+            cell_cols = np.arange(int(keep.sum())) - np.repeat(cell_starts, counts[vectorized])
+            grid_widths = np.zeros((len(order), int(sorted_counts[0])), dtype=np.int64)
+            grid_spaces = np.zeros_like(grid_widths)
+            grid_widths[cell_rows, cell_cols] = unit_widths[keep]
+            grid_spaces[cell_rows, cell_cols] = unit_spaces[keep]
+            lines = _wrap_batch(grid_widths, grid_spaces, available)
+            np.maximum.at(result, candidates[vectorized][order], lines)
+
+        for i in np.flatnonzero(~vectorized).tolist():
+            r = candidates[i]
+            result[r] = max(result[r], count_lines(texts[i], width, font_size_pt, metrics))
+    return result.tolist()
@@ -0,0 +1,276 @@
+import contextvars
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+
+from phases import add_phase_listener
+
+
+# Where spans go: "console" (stderr), "jsonl" (PPTX_TRACE_FILE) or "otlp"
+# (OTLP/HTTP JSON to a collector); unset = no tracing
+TRACE_EXPORTER = os.getenv("PPTX_TRACE_EXPORTER", "")
+TRACE_FILE = os.getenv("PPTX_TRACE_FILE", "traces.jsonl")
+TRACE_OTLP_ENDPOINT = os.getenv("PPTX_TRACE_OTLP_ENDPOINT", "http://localhost:4318/v1/traces")
+TRACE_SERVICE = os.getenv("PPTX_TRACE_SERVICE", "pptx-backend")
+# Spans sent to the collector per request, and the longest a span waits for one
+TRACE_OTLP_BATCH = int(os.getenv("PPTX_TRACE_OTLP_BATCH", "512"))
+TRACE_OTLP_INTERVAL = float(os.getenv("PPTX_TRACE_OTLP_INTERVAL", "2"))
+
+# Span kinds as OTLP numbers them
+INTERNAL, SERVER = 1, 2
+
+logger = logging.getLogger(__name__)
+
+# perf_counter() + this = Unix time, so phase timings line up with wall-clock spans
+_EPOCH_OFFSET = time.time() - time.perf_counter()
+_current = contextvars.ContextVar("pptx_span", default=None)
+
+
+class Span:
+    """One timed operation of a trace; exported when `finish`ed."""
+
+    def __init__(self, name, trace_id=None, parent_id=None, kind=INTERNAL, start=None, attributes=None):
+        self.name = name
+        self.trace_id = trace_id or os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.kind = kind
+        self.start = time.perf_counter() if start is None else start
+        self.end = None
+        self.attributes = dict(attributes or {})
+        self.error = False
+
+    def finish(self, end=None):
+        self.end = time.perf_counter() if end is None else end
+        _exporter.export(self)
+
+    def to_dict(self):
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ns": int((self.start + _EPOCH_OFFSET) * 1e9),
+            "end_ns": int((self.end + _EPOCH_OFFSET) * 1e9),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class ConsoleExporter:
+    """One line per span on stderr."""
+
+    def export(self, span):
+        attributes = " ".join(f"{k}={v}" for k, v in span.attributes.items())
+        print(f"[trace {span.trace_id[:8]}] {span.name} {(span.end - span.start) * 1000:.1f} ms {attributes}",
+              file=sys.stderr, flush=True)
+
+
+class JsonlExporter:
+    """Spans appended to `path` as JSON lines; render worker processes share the file."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+        self._lock = threading.Lock()
+
+    def export(self, span):
+        line = json.dumps(span.to_dict(), ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "a", buffering=1)
+            self._file.write(line)
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def otlp_payload(spans):
+    """ExportTraceServiceRequest for `spans`, in OTLP's JSON encoding."""
+    return {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": TRACE_SERVICE}}]},
+        "scopeSpans": [{
+            "scope": {"name": TRACE_SERVICE},
+            "spans": [
+                {
+                    "traceId": span["trace_id"],
+                    "spanId": span["span_id"],
+                    "parentSpanId": span["parent_id"] or "",
+                    "name": span["name"],
+                    "kind": span["kind"],
+                    "startTimeUnixNano": str(span["start_ns"]),
+                    "endTimeUnixNano": str(span["end_ns"]),
+                    "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in span["attributes"].items()],
+                    "status": {"code": 2} if span["error"] else {},
+                }
+                for span in spans
+            ],
+        }],
+    }]}
+
+
+class OtlpExporter:
+    """Spans batched by a background thread and POSTed to an OTLP/HTTP collector.
+
+    Uses only the standard library. When the collector is down, batches are
+    dropped with a warning rather than piling up.
+    """
+
+    def __init__(self, endpoint, batch_size=TRACE_OTLP_BATCH, interval=TRACE_OTLP_INTERVAL):
+        self.endpoint = endpoint
+        self.batch_size = batch_size
+        self.interval = interval
+        self._queue = queue.Queue(maxsize=batch_size * 20)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def export(self, span):
+        if self._thread is None:
+            # started on first use, in whichever process (API or render worker) exports
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="otlp-export", daemon=True)
+                    self._thread.start()
+        try:
+            self._queue.put_nowait({**span.to_dict(), "kind": span.kind})
+        except queue.Full:
+            pass
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.interval
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get(timeout=max(deadline - time.monotonic(), 0)))
+                except queue.Empty:
+                    break
+            self._post(batch)
+
+    def _post(self, batch):
+        request = urllib.request.Request(
+            self.endpoint,
+            data=json.dumps(otlp_payload(batch), default=str).encode(),
+            headers={"Content-Type": "application/json"},
+        )
+        try:
+            urllib.request.urlopen(request, timeout=5).close()
+        except OSError as e:
+            logger.warning("Dropped %d spans: %s", len(batch), e)
+
+
+def open_exporter(kind=TRACE_EXPORTER):
+    if not kind:
+        return None
+    if kind == "console":
+        return ConsoleExporter()
+    if kind == "jsonl":
+        return JsonlExporter(TRACE_FILE)
+    if kind == "otlp":
+        return OtlpExporter(TRACE_OTLP_ENDPOINT)
+    raise ValueError(f"Unknown trace exporter {kind!r}")
+
+
+_exporter = open_exporter()
+TRACING_ENABLED = _exporter is not None
+
+
+def capture():
+    """(trace id, span id) of the current span, to continue the trace elsewhere; None outside one."""
+    span = _current.get()
+    return (span.trace_id, span.span_id) if span is not None else None
+
+
+@contextmanager
+def resumed_span(carried, name, **attributes):
+    """Span `name` under the span `carried` (from `capture`), current for the block.
+
+    Lets a render worker thread or process add to the trace of the request
+    that queued the work. No-op when `carried` is None.
+    """
+    if carried is None:
+        yield None
+        return
+    span = Span(name, *carried, attributes=attributes)
+    token = _current.set(span)
+    try:
+        yield span
+    except BaseException:
+        span.error = True
+        raise
+    finally:
+        _current.reset(token)
+        span.finish()
+
+
+def _phase_span(name, start, end, attributes):
+    # phases outside a traced request (warm-up, benchmarks) are not exported
+    parent = _current.get()
+    if parent is not None:
+        Span(name, parent.trace_id, parent.span_id, start=start, attributes=attributes).finish(end)
+
+
+if TRACING_ENABLED:
+    add_phase_listener(_phase_span)
+
+
+def _traceparent(headers):
+    """(trace id, parent span id) from a W3C traceparent header, else (None, None)."""
+    for key, value in headers:
+        if key == b"traceparent":
+            parts = value.decode("latin-1").split("-")
+            if len(parts) == 4 and len(parts[1]) == 32 and len(parts[2]) == 16:
+                return parts[1], parts[2]
+    return None, None
+
+
+class TracingMiddleware:
+    """ASGI middleware opening a server span per HTTP request, current until its last body byte.
+
+    Joins the caller's trace when a traceparent header comes in, and sends
+    the trace id back in X-Trace-Id.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        trace_id, parent_id = _traceparent(scope["headers"])
+        span = Span(f"{scope['method']} {scope['path']}", trace_id, parent_id, kind=SERVER,
+                    attributes={"http.request.method": scope["method"], "url.path": scope["path"]})
+        status = 500
+
+        async def send_and_watch(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = [*message.get("headers", ()), (b"x-trace-id", span.trace_id.encode())]
+            await send(message)
+
+        token = _current.set(span)
+        try:
+            await self.app(scope, receive, send_and_watch)
+        finally:
+            _current.reset(token)
+            route = scope.get("route")
+            if route is not None:
+                span.name = f"{scope['method']} {route.path}"
+                span.attributes["http.route"] = route.path
+            span.attributes["http.response.status_code"] = status
+            span.error = status >= 500
+            span.finish()
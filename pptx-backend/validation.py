@@ -0,0 +1,100 @@
+from functools import lru_cache
+from operator import itemgetter
+
+from fastapi import HTTPException
+
+from metrics import count_validation_failure
+from phases import phase
+
+
+STATUS_COLUMN = "Status"
+
+
+def header_key(name):
+    """Column name as limits are looked up: case- and whitespace-insensitive."""
+    return " ".join(str(name).split()).lower()
+
+
+def compile_limits(max_chars):
+    """`max_chars` keyed by `header_key`, so "What is the impact" finds "what is the impact"."""
+    return {header_key(name): limit for name, limit in max_chars.items()}
+
+
+@lru_cache(maxsize=64)
+def _column_limits(columns, limits):
+    """[(column index, column name, limit)] for the columns that have a length limit."""
+    limits = dict(limits)
+    return [
+        (c, name, limits[header_key(name)])
+        for c, name in enumerate(columns)
+        if header_key(name) in limits
+    ]
+
+
+def find_violations(columns, content, limits, first_row=1):
+    """Every problem with a request, as FastAPI-style error dicts.
+
+    `limits` comes from `compile_limits`. Row numbers in messages start at
+    `first_row` (3 for uploaded workbooks, where data starts on row 3);
+    `loc` always indexes into the request body. Over-long cells are found
+    column by column, one sweep per limited column, and reported by row.
+    """
+    errors = []
+    num_cols = len(columns)
+    if STATUS_COLUMN not in columns:
+        errors.append({
+            "loc": ["columns"],
+            "msg": f"'{STATUS_COLUMN}' column not found. Found columns: {columns}",
+            "type": "missing_column",
+        })
+
+    ragged = [r for r, row in enumerate(content) if len(row) != num_cols]
+    for r in ragged:
+        errors.append({
+            "loc": ["content", r],
+            "msg": f"Row {r + first_row} has {len(content[r])} cells, expected {num_cols}.",
+            "type": "row_length",
+        })
+
+    for c, name, limit in _column_limits(tuple(columns), tuple(limits.items())):
+        if ragged:
+            cells = (row[c] if c < len(row) else "" for row in content)
+        else:
+            cells = map(itemgetter(c), content)
+        for r, text in enumerate(cells):
+            if len(text) > limit:
+                errors.append({
+                    "loc": ["content", r, c],
+                    "msg": f"Row {r + first_row}, column '{name}': {len(text)} characters exceeds max length of {limit}.",
+                    "type": "max_length",
+                    "ctx": {"row": r + first_row, "column": name, "max_length": limit},
+                })
+    errors.sort(key=lambda e: e["loc"][1:])  # row by row, in column order
+    return errors
+
+
+def validate_request(columns, content, limits, first_row=1):
+    """Raise one 422 listing every violation found by `find_violations`."""
+    with phase("validate", rows=len(content)) as attributes:
+        errors = find_violations(columns, content, limits, first_row)
+        attributes["violations"] = len(errors)
+    if errors:
+        count_validation_failure(errors)
+        raise HTTPException(status_code=422, detail=errors)
+
+
+def validate_batch(decks, limits):
+    """`validate_request` for several decks at once: one 422 for the whole batch.
+
+    `decks` holds (label, columns, content, first_row) per deck; each error's
+    `loc` is prefixed with the deck's index and its message with the label.
+    """
+    errors = []
+    for i, (label, columns, content, first_row) in enumerate(decks):
+        violations = find_violations(columns, content, limits, first_row)
+        if violations:
+            count_validation_failure(violations)
+        for error in violations:
+            errors.append({**error, "loc": [i, *error["loc"]], "msg": f"{label}: {error['msg']}"})
+    if errors:
+        raise HTTPException(status_code=422, detail=errors)
@@ -0,0 +1,174 @@
+import json
+from itertools import chain
+
+from fastapi import HTTPException
+
+try:
+    import orjson
+except ImportError:  # the standard library parser is used instead, just slower
+    orjson = None
+try:
+    import msgpack
+except ImportError:  # MessagePack bodies are refused with 415
+    msgpack = None
+
+
+MSGPACK_TYPES = {"application/msgpack", "application/x-msgpack", "application/vnd.msgpack"}
+
+_STR_ONLY = {str}
+_LIST_ONLY = {list}
+
+
+class MapOf:
+    """Schema node: an object with any string keys, each value matching `spec`."""
+
+    def __init__(self, spec):
+        self.spec = spec
+
+
+def _error(loc, msg, type_):
+    return {"loc": list(loc), "msg": msg, "type": type_}
+
+
+def _check_str(value, loc, errors):
+    if type(value) is not str:
+        errors.append(_error(loc, "Input should be a valid string", "string_type"))
+
+
+def _list_checker(item):
+    # Lists of strings, and lists of those, are checked with C-level passes over
+    # the item types; the per-item loop only runs to report what is wrong
+    if item is _check_str:
+        def valid(value):
+            return type(value) is list and set(map(type, value)) <= _STR_ONLY
+    elif getattr(item, "item", None) is _check_str:
+        def valid(value):
+            return (type(value) is list and set(map(type, value)) <= _LIST_ONLY
+                    and set(map(type, chain.from_iterable(value))) <= _STR_ONLY)
+    else:
+        valid = None
+
+    def check_list(value, loc, errors):
+        if valid is not None and valid(value):
+            return
+        if type(value) is not list:
+            errors.append(_error(loc, "Input should be a valid list", "list_type"))
+            return
+        for i, v in enumerate(value):
+            item(v, (*loc, i), errors)
+
+    check_list.item = item
+    return check_list
+
+
+def _object_checker(fields):
+    def check_object(value, loc, errors):
+        if type(value) is not dict:
+            errors.append(_error(loc, "Input should be a valid dictionary or object", "dict_type"))
+            return
+        for name, check in fields:
+            if name in value:
+                check(value[name], (*loc, name), errors)
+            else:
+                errors.append(_error((*loc, name), "Field required", "missing"))
+    return check_object
+
+
+def _map_checker(item):
+    def check_map(value, loc, errors):
+        if type(value) is not dict:
+            errors.append(_error(loc, "Input should be a valid dictionary", "dict_type"))
+            return
+        for key, v in value.items():
+            item(v, (*loc, key), errors)
+    return check_map
+
+
+def compile_schema(spec):
+    """Checker for decoded JSON/MessagePack data, built once from `spec`.
+
+    `spec` is `str`, `[item spec]`, `{field: spec}` (required fields, extra
+    ones ignored, as pydantic does) or `MapOf(spec)`. The checker is called
+    as `check(value, loc, errors)` and appends FastAPI-style error dicts.
+    Values must already have the right type; nothing is coerced.
+    """
+    if spec is str:
+        return _check_str
+    if isinstance(spec, list):
+        return _list_checker(compile_schema(spec[0]))
+    if isinstance(spec, MapOf):
+        return _map_checker(compile_schema(spec.spec))
+    if isinstance(spec, dict):
+        return _object_checker([(name, compile_schema(field)) for name, field in spec.items()])
+    raise TypeError(f"Unsupported schema node {spec!r}")
+
+
+# The PPTXRequest body, and the same deck sent column by column
+check_rows = compile_schema({"type": str, "title": str, "columns": [str], "content": [[str]]})
+check_columnar = compile_schema({"type": str, "title": str, "columns": [str], "data": MapOf([str])})
+
+
+def decode_body(body: bytes, content_type=None):
+    """Decoded JSON (the default) or MessagePack body, by `content_type`."""
+    media_type = (content_type or "application/json").split(";")[0].strip().lower()
+    if media_type in MSGPACK_TYPES:
+        if msgpack is None:
+            raise HTTPException(status_code=415, detail="MessagePack bodies are not supported by this server.")
+        try:
+            return msgpack.unpackb(body)
+        except (ValueError, msgpack.exceptions.UnpackException) as e:
+            raise HTTPException(status_code=422, detail=[
+                {"loc": ["body"], "msg": "MessagePack decode error", "type": "msgpack_invalid", "ctx": {"error": str(e)}}
+            ])
+    if media_type != "application/json" and not media_type.endswith("+json"):
+        raise HTTPException(status_code=415, detail=f"Unsupported content type '{media_type}'; "
+                                                    "send application/json or application/msgpack.")
+    try:
+        return orjson.loads(body) if orjson is not None else json.loads(body)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=[
+            {"loc": ["body"], "msg": "JSON decode error", "type": "json_invalid", "ctx": {"error": str(e)}}
+        ])
+
+
+def _columnar_errors(columns, data):
+    errors = []
+    for name in columns:
+        if name not in data:
+            errors.append(_error(("body", "data", name), f"No data for column '{name}'.", "missing_column"))
+    for name in data:
+        if name not in columns:
+            errors.append(_error(("body", "data", name), f"'{name}' is not in columns.", "unknown_column"))
+    lengths = {len(data[name]) for name in columns if name in data}
+    if len(lengths) > 1:
+        for name in columns:
+            if name in data:
+                errors.append(_error(("body", "data", name),
+                                     f"Column '{name}' has {len(data[name])} values; columns differ in length.",
+                                     "column_length"))
+    return errors
+
+
+def parse_deck_request(body: bytes, content_type=None):
+    """(type, title, columns, content rows) from a /generate-pptx body.
+
+    The body is a PPTXRequest, or the columnar form that replaces `content`
+    with `data`: {column name: [cell, ...]}. Either comes as JSON or
+    MessagePack. Schema problems are raised as one 422, like FastAPI's own.
+    """
+    value = decode_body(body, content_type)
+    columnar = type(value) is dict and "data" in value and "content" not in value
+    errors = []
+    (check_columnar if columnar else check_rows)(value, ("body",), errors)
+    if columnar and not errors:
+        errors = _columnar_errors(value["columns"], value["data"])
+    if errors:
+        raise HTTPException(status_code=422, detail=errors)
+
+    columns = value["columns"]
+    if columnar:
+        data = value["data"]
+        content = list(map(list, zip(*(data[name] for name in columns))))
+    else:
+        content = value["content"]
+    return (value["type"], value["title"], columns, content)
@@ -0,0 +1,49 @@
+import time
+import zipfile
+
+
+class _Sink:
+    """Write-only file object that hands back what was written since the last drain."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class ZipStream:
+    """Zip archive built one member at a time, for streaming to a client.
+
+    Each call returns the bytes to send next, so nothing but the member being
+    added is held in memory. Members are stored as is by default (a zip of
+    decks would not shrink); `compresslevel` applies to ZIP_DEFLATED.
+    """
+
+    def __init__(self, compression=zipfile.ZIP_STORED, compresslevel=None):
+        self.compression = compression
+        self.compresslevel = compresslevel
+        self._sink = _Sink()
+        # no tell()/seek() on the sink, so zipfile writes data descriptors
+        self._zip = zipfile.ZipFile(self._sink, "w", compression)
+
+    def add(self, name, data):
+        info = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+        info.compress_type = self.compression
+        info.external_attr = 0o644 << 16
+        self._zip.writestr(info, data, compresslevel=self.compresslevel)
+        return self._sink.drain()
+
+    def close(self):
+        """Central directory; the archive is complete once this is sent."""
+        self._zip.close()
+        return self._sink.drain()
@@ -7,6 +7,23 @@ export interface ProjectUpdatePayload {
   content: string[][];
 }
 
+// FastAPI errors carry `detail`: a message, or a list of {loc, msg} entries
+// (validation reports every offending cell at once)
+const errorMessage = async (response: Response, prefix: string): Promise<string> => {
+  try {
+    const { detail } = await response.json();
+    if (Array.isArray(detail)) {
+      return `${prefix}:\n${detail.map((e: { msg: string }) => e.msg).join("\n")}`;
+    }
+    if (typeof detail === "string") {
+      return `${prefix}: ${detail}`;
+    }
+  } catch {
+    // not a JSON error body
+  }
+  return `${prefix}: ${response.statusText}`;
+};
+
 export const generatePptxFromJson = async (payload: ProjectUpdatePayload): Promise<Blob> => {
   const response = await fetch(`${BASE_URL}/generate-pptx`, {
     method: "POST",
@@ -18,7 +35,7 @@ export const generatePptxFromJson = async (payload: ProjectUpdatePayload): Promi
   });
 
   if (!response.ok) {
-    throw new Error(`Failed to generate PPTX: ${response.statusText}`);
+    throw new Error(await errorMessage(response, "Failed to generate PPTX"));
   }
 
   return response.blob();
@@ -37,7 +54,7 @@ export const generatePptxFromExcel = async (file: File): Promise<Blob> => {
   });
 
   if (!response.ok) {
-    throw new Error(`Failed to generate PPTX from Excel: ${response.statusText}`);
+    throw new Error(await errorMessage(response, "Failed to generate PPTX from Excel"));
   }
 
   return response.blob();